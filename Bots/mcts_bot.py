@@ -0,0 +1,288 @@
+# MONTE CARLO TREE SEARCH BOT #
+# UCT selection with rollouts that mostly walk the shortest path to the goal and now and #
+# then drop a random wall. The subtree under the moves actually played is kept between moves #
+
+import random
+import math
+import time
+
+from v1 import WALL_ACTIONS
+from search_stats import SearchStats
+from opening_book import open_book
+import endgame
+
+class Node:
+    def __init__(self, parent, move, player_id):
+        '''
+        Node of the search tree.
+
+        parent:     Parent node, or None for the root (Node)
+        move:       Action leading to this node as (action_type, action)
+        player_id:  Player who made that action, so wins are
+                    counted from their point of view (int)
+        '''
+        self.parent = parent
+        self.move = move
+        self.player_id = player_id
+        self.children = []
+        self.untried = None # actions not expanded yet, filled in on the first visit
+        self.visits = 0
+        self.wins = 0.0
+
+    def child(self, move):
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+
+
+class MCTSBot:
+    def __init__(self, game, player_id, iterations = 1000, time_limit = None, exploration = 1.4,
+                 rollout_depth = 60, wall_probability = 0.05, collect_stats = True, log_sink = None, book = None):
+        '''
+        Bot that picks its moves with Monte Carlo tree search.
+
+        game:               Game to play in (Game)
+        player_id:          Player the bot plays as (int)
+        iterations:         Iterations per move, or None for no limit (int)
+        time_limit:         Seconds per move, or None for no limit (float)
+        exploration:        UCT exploration constant (float)
+        rollout_depth:      Plies a rollout is played out for before the
+                            shorter path to the goal decides it (int)
+        wall_probability:   Chance that a rollout move is a random wall (float)
+        book:               Opening book, or the path of one, consulted
+                            before searching (OpeningBook or str)
+        '''
+        self.game = game
+        self.player_id = player_id
+        self.bot = self.game.players[self.player_id]
+        self.player = self.game.players[1 - self.player_id]
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.wall_probability = wall_probability
+        self.root = None
+        self.root_actions = [] # game.actions at the root, to tell which moves were played since
+        self.nodes = 0
+        self.reused_visits = 0
+        self.collect_stats = collect_stats
+        self.log_sink = log_sink # called with the SearchStats of every search, or None
+        self.last_stats = None
+        self.book = open_book(book)
+
+    def make_move(self, iterations = None, time_limit = None):
+        # Check if it's the bot's turn
+        if self.game.cur_player != self.player_id:
+            return False
+        book_move = self.book.lookup(self.game) if self.book is not None else None
+        if book_move is not None and self.game.perform_action(self.bot, book_move[0], book_move[1]):
+            self.advance_root()
+            return True
+        solved = endgame.solve(self.game) # exact once both players are out of walls
+        if solved is not None and solved[2] is not None and self.game.perform_action(self.bot, solved[2][0], solved[2][1]):
+            self.advance_root()
+            return True
+        best_move = self.choose_move(iterations, time_limit)
+        if best_move is None:
+            return False
+        if not self.game.perform_action(self.bot, best_move[0], best_move[1]):
+            return False
+        self.advance_root()
+        return True
+
+
+
+    def choose_move(self, iterations = None, time_limit = None):
+        '''
+        Grows the search tree from the current position and
+        returns the most visited action, or None if there is
+        no legal action.
+
+        iterations: Overrides the iteration budget (int)
+        time_limit: Overrides the time budget (float)
+        '''
+        game = self.game
+        iterations = self.iterations if iterations is None else iterations
+        time_limit = self.time_limit if time_limit is None else time_limit
+        start = time.perf_counter()
+        deadline = None if time_limit is None else start + time_limit
+        if iterations is None and deadline is None:
+            raise ValueError("MCTSBot needs an iteration or time budget")
+
+        self.advance_root()
+        self.reused_visits = self.root.visits
+        self.nodes = 0
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and done and time.perf_counter() > deadline:
+                break
+            self.iterate(game)
+            done += 1
+
+        if not self.root.children:
+            return None
+        best = max(self.root.children, key = lambda child: child.visits)
+        if self.collect_stats:
+            stats = SearchStats()
+            stats.elapsed = time.perf_counter() - start
+            stats.nodes = self.nodes
+            stats.leaf_evaluations = done
+            stats.tt_hits = self.reused_visits
+            stats.principal_variation = self.principal_variation()
+            stats.completed_depth = len(stats.principal_variation)
+            stats.depths = [(stats.completed_depth, stats.elapsed, self.nodes)]
+            stats.best_score = best.wins / best.visits
+            stats.best_move = best.move
+            self.last_stats = stats
+            if self.log_sink is not None:
+                self.log_sink(stats)
+        return best.move
+
+
+
+    def advance_root(self):
+        '''
+        Moves the root down the tree along the actions played
+        since the last search, or starts a new tree if they are
+        not in it.
+        '''
+        actions = self.game.actions
+        node = self.root
+        if node is not None and actions[:len(self.root_actions)] == self.root_actions:
+            for move in actions[len(self.root_actions):]:
+                node = node.child(move)
+                if node is None:
+                    break
+        else:
+            node = None
+        if node is None:
+            node = Node(None, None, 1 - self.game.cur_player)
+        node.parent = None
+        self.root = node
+        self.root_actions = list(actions)
+
+
+
+    def iterate(self, game):
+        '''
+        Runs one iteration of selection, expansion, rollout and
+        backpropagation, leaving the game as it was.
+
+        game:   Game at the root of the tree (Game)
+        '''
+        node = self.root
+        plies = 0
+        while node.untried is not None and not node.untried and node.children:
+            node = self.select_child(node)
+            game.perform_action(game.players[game.cur_player], node.move[0], node.move[1])
+            plies += 1
+
+        if node.untried is None:
+            node.untried = self.untried_actions(game)
+        if node.untried:
+            move = node.untried.pop()
+            player_id = game.cur_player
+            game.perform_action(game.players[player_id], move[0], move[1])
+            plies += 1
+            child = Node(node, move, player_id)
+            node.children.append(child)
+            node = child
+            self.nodes += 1
+
+        winner = self.rollout(game)
+        for _ in range(plies):
+            game.undo_last_move()
+
+        while node is not None:
+            node.visits += 1
+            if winner == node.player_id:
+                node.wins += 1
+            node = node.parent
+
+
+
+    def select_child(self, node):
+        # UCT: average result plus an exploration bonus for rarely visited children
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children, key = lambda child:
+                   child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+
+
+    def untried_actions(self, game):
+        # Shuffled so that expansion order is random, with the pawn moves at
+        # the end of the list so that they are expanded first
+        if game.winner is not None:
+            return []
+        moves, walls = [], []
+        for action in game.legal_actions():
+            (moves if action[0] == "move" else walls).append(action)
+        random.shuffle(moves)
+        random.shuffle(walls)
+        return walls + moves
+
+
+
+    def rollout(self, game):
+        '''
+        Plays the game out from the current position and returns
+        the winner, leaving the game as it was. Players step along
+        their shortest path, sometimes placing a random wall
+        instead. If nobody has won after rollout_depth plies, the
+        player who is closer to their goal wins, counting the
+        player to move as a step ahead.
+
+        game:   Game to play out (Game)
+        '''
+        plies = 0
+        while game.winner is None and plies < self.rollout_depth:
+            player = game.players[game.cur_player]
+            if player.remaining_walls and random.random() < self.wall_probability:
+                wall = random.choice(WALL_ACTIONS)[0]
+                if game.perform_action(player, "wall", wall):
+                    plies += 1
+                    continue
+            if not self.step_towards_goal(game, player):
+                break
+            plies += 1
+
+        winner = game.winner
+        if winner is None:
+            player = game.players[game.cur_player]
+            _, own = game.check_path_to_end(player)
+            _, other = game.check_path_to_end(game.players[1 - player.player_id])
+            winner = player.player_id if own <= other else 1 - player.player_id
+        for _ in range(plies):
+            game.undo_last_move()
+        return winner
+
+
+
+    def step_towards_goal(self, game, player):
+        # Takes the next step of the player's shortest path, jumping over
+        # the opponent if they are in the way, or a random legal step
+        path = game.shortest_path(player)
+        x, y = player.pos
+        dir = (path[1][0] - x, path[1][1] - y)
+        if game.perform_action(player, "move", dir):
+            return True
+        if game.perform_action(player, "move", (2 * dir[0], 2 * dir[1])):
+            return True
+        moves = game.legal_pawn_moves(player)
+        if not moves:
+            return False
+        return game.perform_action(player, "move", random.choice(moves))
+
+
+
+    def principal_variation(self):
+        # Follows the most visited child from the root
+        variation = []
+        node = self.root
+        while node.children:
+            node = max(node.children, key = lambda child: child.visits)
+            variation.append(node.move)
+        return variation
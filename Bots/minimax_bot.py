@@ -1,36 +1,64 @@
-from copy import deepcopy
-
 # MINIMAX BOT # 
 
 import random
 import math
+import time
+
+from search_stats import SearchStats
+from opening_book import open_book
+import endgame
 
 class MiniMaxBot:
-    def __init__(self, game, player_id):
+    def __init__(self, game, player_id, batch_leaves = False, collect_stats = True, log_sink = None, book = None):
         self.game = game
         self.player_id = player_id
         self.bot = self.game.players[self.player_id]
         self.player = self.game.players[1 - self.player_id]
+        self.batch_leaves = batch_leaves # score the leaves under each response together with NumPy
+        if batch_leaves:
+            import distance_fields # needs NumPy, so it is only imported when asked for
+            self.distance_fields = distance_fields
+        self.collect_stats = collect_stats
+        self.log_sink = log_sink # called with the SearchStats of every search, or None
+        self.last_stats = None
+        self.book = open_book(book) # opening book consulted before searching, or None
 
     def make_move(self):
         # Check if it's the bot's turn
         if self.game.cur_player != self.player_id:
             return False
+        book_move = self.book.lookup(self.game) if self.book is not None else None
+        if book_move is not None and self.game.perform_action(self.bot, book_move[0], book_move[1]):
+            return True
+        solved = endgame.solve(self.game) # exact once both players are out of walls
+        if solved is not None and solved[2] is not None:
+            return self.game.perform_action(self.bot, solved[2][0], solved[2][1])
 
+        start = time.perf_counter()
+        nodes = 1
+        leaf_evaluations = 0
         max_min_max_h = None
         best_move = None
         for move in self.generate_all_legal_moves(self.game, self.bot):
             self.game.perform_action(self.bot, move[0], move[1])
+            nodes += 1
             min_max_h = None
             for response in self.generate_all_legal_moves(self.game, self.player):
                 self.game.perform_action(self.player, response[0], response[1])
+                nodes += 1
                 max_h = None
-                for next_move in self.generate_all_legal_moves(self.game, self.bot):
-                    self.game.perform_action(self.bot, next_move[0], next_move[1])
-                    x = self.heuristic(self.game, self.bot, self.player)
-                    if max_h == None or max_h < x:
-                        max_h = x
-                    self.game.undo_last_move()
+                if self.batch_leaves:
+                    leaf_scores = self.batch_heuristic(self.game, self.bot, self.player)
+                    leaf_evaluations += len(leaf_scores)
+                    max_h = max(leaf_scores)
+                else:
+                    for next_move in self.generate_all_legal_moves(self.game, self.bot):
+                        self.game.perform_action(self.bot, next_move[0], next_move[1])
+                        x = self.heuristic(self.game, self.bot, self.player)
+                        leaf_evaluations += 1
+                        if max_h == None or max_h < x:
+                            max_h = x
+                        self.game.undo_last_move()
                 if min_max_h == None or min_max_h > max_h:
                     min_max_h = max_h
                 self.game.undo_last_move()
@@ -38,23 +66,37 @@ class MiniMaxBot:
                 best_move = move
                 max_min_max_h = min_max_h
             self.game.undo_last_move()
-        print(max_min_max_h)
+        nodes += leaf_evaluations
+        if self.collect_stats:
+            stats = SearchStats()
+            stats.elapsed = time.perf_counter() - start
+            stats.nodes = nodes
+            stats.leaf_evaluations = leaf_evaluations
+            stats.depths = [(3, stats.elapsed, nodes)]
+            stats.completed_depth = 3
+            stats.best_score, stats.best_move = max_min_max_h, best_move
+            stats.principal_variation = [best_move]
+            self.last_stats = stats
+            if self.log_sink is not None:
+                self.log_sink(stats)
         
         self.game.perform_action(self.bot, best_move[0], best_move[1])
                 
     
     def generate_all_legal_moves(self, game, player):
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
-        walls_pos = [(i+1.5, j+1.5) for i in range(8) for j in range(8)]
-        for dir in directions:
-            if game.is_legal_move(player, dir):
-                yield "move", dir
-
-        for wall_pos in walls_pos:
-            if game.is_legal_wall(player, wall_pos, "vertical", undo_successful_wall = True):
-                yield "wall", (wall_pos, "vertical")
-            if game.is_legal_wall(player, wall_pos, "horizontal", undo_successful_wall = True):
-                yield "wall", (wall_pos, "horizontal")
+        return game.legal_actions(player)
 
     def heuristic(self, game, bot, player):
-        return game.check_path_to_end(player)[1]**2 - game.check_path_to_end(bot)[1] + abs(bot.remaining_walls - player.remaining_walls) ** 1.5
\ No newline at end of file
+        return game.check_path_to_end(player)[1]**2 - game.check_path_to_end(bot)[1] + abs(bot.remaining_walls - player.remaining_walls) ** 1.5
+
+    def batch_heuristic(self, game, bot, player):
+        # The heuristic of the position after every legal action of the bot, with the path
+        # lengths of all of them looked up in distance fields computed in one batch
+        actions = list(self.generate_all_legal_moves(game, bot))
+        positions = self.distance_fields.child_positions(game, bot, actions)
+        lengths = self.distance_fields.path_lengths([mask for mask, _ in positions], [squares for _, squares in positions]).tolist()
+        scores = []
+        for (action_type, _), path_lens in zip(actions, lengths):
+            bot_walls = bot.remaining_walls - (action_type == "wall")
+            scores.append(path_lens[player.player_id]**2 - path_lens[bot.player_id] + abs(bot_walls - player.remaining_walls) ** 1.5)
+        return scores
\ No newline at end of file
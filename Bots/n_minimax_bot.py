@@ -1,33 +1,68 @@
-from copy import deepcopy
-
 # MINIMAX BOT # 
 
 import random
 import math
+import time
+
+from search_stats import SearchStats
+from opening_book import open_book
+import endgame
 
 class nMiniMaxBot:
-    def __init__(self, game, player_id, n):
+    def __init__(self, game, player_id, n, collect_stats = True, log_sink = None, book = None):
         self.game = game
         self.player_id = player_id
         self.bot = self.game.players[self.player_id]
         self.player = self.game.players[1 - self.player_id]
         self.n = n # how many moves ahead we look
         self.stored_states = {}
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.stored_state_hits = 0
+        self.collect_stats = collect_stats
+        self.log_sink = log_sink # called with the SearchStats of every search, or None
+        self.last_stats = None
+        self.book = open_book(book) # opening book consulted before searching, or None
 
     def make_move(self):
         # Check if it's the bot's turn
         if self.game.cur_player != self.player_id:
             return False
+        book_move = self.book.lookup(self.game) if self.book is not None else None
+        if book_move is not None and self.game.perform_action(self.bot, book_move[0], book_move[1]):
+            return True
+        solved = endgame.solve(self.game) # exact once both players are out of walls
+        if solved is not None and solved[2] is not None:
+            return self.game.perform_action(self.bot, solved[2][0], solved[2][1])
         self.stored_states = {}
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.stored_state_hits = 0
+        start = time.perf_counter()
         max_depth = self.n
         best_score, best_move = self.minimax(self.game, max_depth, maximizing_score = True)
-        print(best_score)
+        if self.collect_stats:
+            stats = SearchStats()
+            stats.elapsed = time.perf_counter() - start
+            stats.nodes = self.nodes
+            stats.leaf_evaluations = self.leaf_evaluations
+            stats.tt_hits = self.stored_state_hits
+            stats.tt_probes = self.nodes - 1 + self.stored_state_hits
+            stats.depths = [(max_depth, stats.elapsed, self.nodes)]
+            stats.completed_depth = max_depth
+            stats.best_score, stats.best_move = best_score, best_move
+            stats.principal_variation = [best_move]
+            self.last_stats = stats
+            if self.log_sink is not None:
+                self.log_sink(stats)
         self.game.perform_action(self.bot, best_move[0], best_move[1])
 
     
 
     def minimax(self, game, depth, maximizing_score):
+        self.nodes += 1
         if depth == 0 or game.winner:
+            self.leaf_evaluations += 1
             return self.heuristic(game, self.bot, self.player), None
 
         best_score = None
@@ -36,6 +71,7 @@ class nMiniMaxBot:
             if game.perform_action(cur_player, action_type, action):
                 gamestate = self.hash_game_state(game)
                 if gamestate in self.stored_states:
+                    self.stored_state_hits += 1
                     score = self.stored_states[gamestate]
                 else:
                     score, _ = self.minimax(game, depth - 1, not maximizing_score)
@@ -53,14 +89,8 @@ class nMiniMaxBot:
                 
     
     def generate_all_moves(self):
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
-        walls_pos = [(i+1.5, j+1.5) for i in range(8) for j in range(8)]
-        for dir in directions:
-            yield "move", dir
-
-        for wall_pos in walls_pos:
-            yield "wall", (wall_pos, "vertical")
-            yield "wall", (wall_pos, "horizontal")
+        # Only legal actions of the player to move, so perform_action never fails
+        return self.game.legal_actions()
 
 
 
@@ -87,43 +117,11 @@ class nMiniMaxBot:
 
 
     def hash_game_state(self, game):
-        # Initialize an empty string
-        hash_string = ''
-
-        # Add player positions
-        for player in game.players:
-            hash_string += f'P{player.player_id}:{player.pos}'
-
-        # Add walls
-        for wall in sorted(game.walls):
-            hash_string += f'W:{wall}'
-
-        # Add current player
-        hash_string += f'Current:{game.cur_player}'
-
-        # Use a hash function (e.g., hash(), md5, etc.)
-        return hash(hash_string)  # Simple Python hash function
+        # Zobrist key kept up to date by the game itself
+        return game.zobrist
     
 
 
     def num_legal_moves(self, game, player):
-        count = 0
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Immediate moves only
-        wall_positions = self.strategic_wall_positions(player)  # A subset of wall positions
-
-        for dir in directions:
-            if game.is_legal_move(player, dir):
-                count += 1
-
-        for wall_pos in wall_positions:
-            if game.is_legal_wall(player, wall_pos, "vertical", undo_successful_wall=True):
-                count += 1
-            if game.is_legal_wall(player, wall_pos, "horizontal", undo_successful_wall=True):
-                count += 1
-
-        return count
-
-    def strategic_wall_positions(self, player):
-        # Example: Return wall positions near the player and along central paths
-        x, y = player.pos
-        return [(x + dx, y + dy) for dx in range(-1, 2) for dy in range(-1, 2) if 1.5 <= x + dx <= 8.5 and 1.5 <= y + dy <= 8.5]
+        # Legal pawn moves only; the walls the old count tried were never at wall centers
+        return game.mobility(player)
@@ -1,88 +1,367 @@
 # MINIMAX BOT  WITH ALPHA-BETA PRUNING #
-# NEXT UP WILL BE USING KILLER HEURISTIC #
+# MOVES ARE ORDERED WITH THE TRANSPOSITION TABLE, KILLER MOVES AND A HISTORY TABLE #
+# THE SEARCH WORKS ON ACTION CODES, AND ONLY choose_move RETURNS AN ACTION TUPLE #
 
-from copy import deepcopy
 import random
 import math
+import time
+
+from v1 import ACTIONS, NUM_DIRECTIONS
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from search_stats import SearchStats
+from opening_book import open_book
+import endgame
+
+NULL_WINDOW = 1e-6 # width of the scout window used by principal variation search
+
+# The heuristic weighs its terms by the number of actions played, so the same position
+# scores differently at different move counts. Table keys mix in one of these keys for
+# the move count, so that a stored score is only reused at the move count it was found at.
+ply_key_rng = random.Random(0x504c59)
+PLY_KEYS = tuple(ply_key_rng.getrandbits(64) for _ in range(1024))
+
+class SearchAborted(Exception):
+    # Raised inside minimax when the time or node budget runs out
+    pass
 
 class nMiniMaxPruningBot:
-    def __init__(self, game, player_id, n):
+    def __init__(self, game, player_id, n, tt_size = 1 << 18, use_killers = True, use_history = True,
+                 use_pvs = False, aspiration_window = None, collect_stats = True, log_sink = None, book = None,
+                 use_old_entries = True):
         self.game = game
         self.player_id = player_id
         self.bot = self.game.players[self.player_id]
         self.player = self.game.players[1 - self.player_id]
         self.n = n # how many moves ahead we look
-        self.stored_states = {}
+        self.tt = TranspositionTable(tt_size) # kept between moves, entries from older searches are replaced first
+        self.use_old_entries = use_old_entries # cut off on entries from earlier searches, not only order moves by them
+        self.root_ply = None
+        self.root_scores = {}
+        self.root_index = {}
+        self.deadline = None
+        self.max_nodes = None
+        self.nodes = 0
+        self.completed_depth = 0
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.killers = {} # ply -> the last two moves that caused a cutoff there
+        self.history = {} # wall code -> how often (weighted by depth) it caused a cutoff
+        self.cutoffs = {} # ply -> number of cutoffs
+        self.first_move_cutoffs = {} # ply -> number of cutoffs by the first move tried
+        self.use_pvs = use_pvs # scout all but the first child with a null window
+        self.aspiration_window = aspiration_window # half-width of the root window around the previous score, or None
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        self.leaf_evaluations = 0
+        self.collect_stats = collect_stats
+        self.log_sink = log_sink # called with the SearchStats of every search, or None
+        self.last_stats = None
+        self.book = open_book(book) # opening book consulted before searching, or None
+        self.stop = False # set from another thread to abort the running search
 
-    def make_move(self):
+    def make_move(self, time_limit = None, max_nodes = None, max_depth = None):
         # Check if it's the bot's turn
         if self.game.cur_player != self.player_id:
             return False
-        self.stored_states = {}
-        max_depth = self.n
-        best_score, best_move = self.minimax(-1e20, 1e20, self.game, max_depth, maximizing_score = True)
-        print(best_score)
-        self.game.perform_action(self.bot, best_move[0], best_move[1])
+        action = self.best_action(time_limit, max_nodes, max_depth)
+        return action is not None and self.game.perform_action(self.bot, action[0], action[1])
+
+
+
+    def best_action(self, time_limit = None, max_nodes = None, max_depth = None):
+        '''
+        Returns the action make_move would play as (action_type,
+        action): the book move if there is one, the race solver's
+        move once both players are out of walls, and otherwise the
+        result of choose_move. Returns None if the search is
+        stopped before depth 1 is completed.
+
+        time_limit:     Wall-clock budget in seconds, or None (float)
+        max_nodes:      Budget of visited nodes, or None (int)
+        max_depth:      Deepest iteration, as for choose_move (int)
+        '''
+        book_move = self.book.lookup(self.game) if self.book is not None else None
+        if book_move is not None and self.game.perform_action(self.bot, book_move[0], book_move[1]):
+            self.game.undo()
+            return book_move
+        solved = endgame.solve(self.game) # exact once both players are out of walls
+        if solved is not None and solved[2] is not None:
+            return solved[2]
+        result = self.choose_move(time_limit, max_nodes, max_depth)
+        return None if result is None else result[1]
+
+
+
+    def predicted_replies(self):
+        '''
+        Returns the codes of the opponent's legal actions in the
+        current position, most likely first: the reply the last
+        search expected, then the killer moves one ply below its
+        root, pawn moves, and walls with the best history first.
+        '''
+        entry = self.tt.probe(self.hash_game_state(self.game))
+        return self.ordered_moves(entry[4] if entry is not None else None, 1)
+
+
+
+    def choose_move(self, time_limit = None, max_nodes = None, max_depth = None):
+        '''
+        Searches the current position with iterative deepening and
+        returns (score, move) from the last fully completed depth,
+        without playing the move. Depth 1 is always completed
+        unless self.stop is set, in which case None is returned.
+        The move is an (action_type, action) tuple, while
+        root_scores and the transposition table hold action codes.
+
+        time_limit:     Wall-clock budget in seconds, or None (float)
+        max_nodes:      Budget of visited nodes, or None (int)
+        max_depth:      Deepest iteration, defaults to n without a budget
+                        and to no limit with one (int)
+        '''
+        if max_depth is None:
+            max_depth = self.n if time_limit is None and max_nodes is None else 100
+        game = self.game
+        self.tt.new_search()
+        self.root_ply = len(game.actions)
+        self.root_scores = {}
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.completed_depth = 0
+        self.killers = {}
+        self.history = {move: count // 2 for move, count in self.history.items() if count > 1}
+        self.cutoffs = {}
+        self.first_move_cutoffs = {}
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        self.leaf_evaluations = 0
+        if self.collect_stats:
+            stats = SearchStats()
+            start = time.perf_counter()
+            tt_hits = self.tt.hits
+            tt_probes = self.tt.hits + self.tt.misses + self.tt.collisions
+
+        best = None
+        for depth in range(1, max_depth + 1):
+            if self.collect_stats:
+                iteration_start = time.perf_counter()
+                iteration_nodes = self.nodes
+            try:
+                best = self.search_root(game, depth, best)
+            except SearchAborted:
+                while len(game.actions) > self.root_ply:
+                    game.undo_last_move()
+                break
+            self.completed_depth = depth
+            if self.collect_stats:
+                stats.depths.append((depth, time.perf_counter() - iteration_start, self.nodes - iteration_nodes))
+            if abs(best[0]) >= 10000: # forced win or loss found, deeper searches can not change it
+                break
+        if best is None:
+            return None
+
+        if self.collect_stats:
+            stats.elapsed = time.perf_counter() - start
+            stats.nodes = self.nodes
+            stats.leaf_evaluations = self.leaf_evaluations
+            stats.tt_hits = self.tt.hits - tt_hits
+            stats.tt_probes = self.tt.hits + self.tt.misses + self.tt.collisions - tt_probes
+            stats.cutoffs = dict(self.cutoffs)
+            stats.first_move_cutoffs = dict(self.first_move_cutoffs)
+            stats.completed_depth = self.completed_depth
+            stats.best_score, stats.best_move = best[0], ACTIONS[best[1]]
+            stats.principal_variation = self.principal_variation(best[1], self.completed_depth)
+            self.last_stats = stats
+            if self.log_sink is not None:
+                self.log_sink(stats)
+        return best[0], ACTIONS[best[1]]
+
+
+
+    def principal_variation(self, first_move, depth):
+        # Follows the best moves stored in the transposition table from the root
+        game = self.game
+        variation = []
+        move = first_move
+        while move is not None and len(variation) < depth and game.winner is None:
+            if not game.play(move):
+                break
+            variation.append(ACTIONS[move])
+            entry = self.tt.probe(self.hash_game_state(game))
+            move = entry[4] if entry is not None else None
+        for _ in variation:
+            game.undo()
+        return variation
 
     
 
+    def search_root(self, game, depth, previous):
+        # With aspiration windows the root is first searched in a narrow window around the
+        # previous iteration's score, and again with the full window if the score falls outside
+        if self.aspiration_window is not None and previous is not None and abs(previous[0]) < 10000:
+            alpha = previous[0] - self.aspiration_window
+            beta = previous[0] + self.aspiration_window
+            result = self.minimax(alpha, beta, game, depth, maximizing_score = True)
+            if alpha < result[0] < beta:
+                return result
+            self.aspiration_researches += 1
+        return self.minimax(-1e20, 1e20, game, depth, maximizing_score = True)
+
+
+
     def minimax(self, alpha, beta, game, depth, maximizing_score):
-        if depth == self.n:
-            best_10 = []
+        root = len(game.actions) == self.root_ply
+        self.nodes += 1
+        if self.stop or self.completed_depth and (self.max_nodes is not None and self.nodes > self.max_nodes
+                                                  or self.deadline is not None and time.perf_counter() > self.deadline):
+            raise SearchAborted
 
-        if depth == 0 or game.winner:
+        if depth == 0 or game.winner is not None:
+            self.leaf_evaluations += 1
             return self.heuristic(game, self.bot, self.player), None
 
+        # Scores are always from the bot's point of view, so a lower bound can
+        # raise alpha and an upper bound can lower beta at both kinds of nodes
+        gamestate = self.hash_game_state(game)
+        entry = self.tt.probe(gamestate)
+        tt_move = None
+        if entry is not None:
+            _, entry_depth, flag, entry_score, tt_move, generation = entry
+            if entry_depth >= depth and not root and (self.use_old_entries or generation == self.tt.generation):
+                if flag == EXACT:
+                    return entry_score, tt_move
+                elif flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score, tt_move
+        alpha_orig, beta_orig = alpha, beta
+
         best_move = None
         best_score = -1e40 if maximizing_score else 1e40
-        cur_player = game.players[game.cur_player]
 
-        for action_type, action in self.generate_all_moves():
-            if game.perform_action(cur_player, action_type, action):
-                gamestate = self.hash_game_state(game)
-                if gamestate in self.stored_states:
-                    score = self.stored_states[gamestate]
-                else:
+        ply = len(game.actions) - (self.root_ply or 0)
+        moves = self.root_moves(tt_move) if root else self.ordered_moves(tt_move, ply)
+        for i, move in enumerate(moves):
+            if game.play(move):
+                if root:
+                    # Lowering alpha by a hair keeps the scores of moves that tie with the
+                    # best so far exact, so ties can be broken by the order moves are generated in
+                    score, _ = self.minimax(alpha - NULL_WINDOW, beta, game, depth - 1, False)
+                elif not self.use_pvs or i == 0:
                     score, _ = self.minimax(alpha, beta, game, depth - 1, not maximizing_score)
-                    self.stored_states[gamestate] = score
-                
-                game.undo_last_move()
+                else:
+                    # Prove the child is no better than the moves so far with a null window,
+                    # and only search it with the full window if that fails
+                    if maximizing_score:
+                        score, _ = self.minimax(alpha, alpha + NULL_WINDOW, game, depth - 1, False)
+                    else:
+                        score, _ = self.minimax(beta - NULL_WINDOW, beta, game, depth - 1, True)
+                    if alpha < score < beta:
+                        self.pvs_researches += 1
+                        score, _ = self.minimax(alpha, beta, game, depth - 1, not maximizing_score)
+                game.undo()
+                if root:
+                    self.root_scores[move] = score
                 if maximizing_score:
-                    if score > best_score:
+                    if score > best_score or root and score == best_score and self.root_index[move] < self.root_index[best_move]:
                         best_score = score
-                        best_move = (action_type, action)
-                    if depth == self.n: ### THIS IF STATEMENT IS ONLY TO GATHER INFO ON HOW GOOD THE BEST MOVES ARE
-                        if len(best_10) < 10:
-                            best_10.append(round(score,2))
-                        elif min(best_10) < score:
-                            best_10.remove(min(best_10))
-                            best_10.append(round(score,2))
+                        best_move = move
                     alpha = max(alpha, best_score)
-                    if best_score > beta:
+                    if best_score >= beta:
+                        self.record_cutoff(move, ply, depth, i)
                         break
                 else:
                     if score < best_score:
                         best_score = score
-                        best_move = (action_type, action)
+                        best_move = move
                     beta = min(beta, best_score)
-                    if best_score < alpha:
+                    if best_score <= alpha:
+                        self.record_cutoff(move, ply, depth, i)
                         break
-        
-        if depth == self.n:
-            print(best_10)
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(gamestate, depth, flag, best_score, best_move)
+
         return best_score, best_move
     
+
+
+    def record_cutoff(self, move, ply, depth, index):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+        if index == 0:
+            self.first_move_cutoffs[ply] = self.first_move_cutoffs.get(ply, 0) + 1
+        if self.use_killers:
+            killers = self.killers.setdefault(ply, [None, None])
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        if self.use_history and move >= NUM_DIRECTIONS:
+            self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+
+    def cutoff_stats(self):
+        # Cutoffs per ply of the last search, and how many of them the first move tried produced
+        return {
+            "nodes": self.nodes,
+            "completed_depth": self.completed_depth,
+            "cutoffs": dict(sorted(self.cutoffs.items())),
+            "first_move_cutoffs": dict(sorted(self.first_move_cutoffs.items())),
+            "pvs_researches": self.pvs_researches,
+            "aspiration_researches": self.aspiration_researches,
+        }
+
+
+
+    def root_moves(self, first_move):
+        # Order the root by the scores of the previous iteration, best first
+        self.root_index = {move: i for i, move in enumerate(self.generate_all_moves())}
+        moves = self.ordered_moves(first_move, 0)
+        if self.root_scores:
+            previous = self.root_scores
+            moves.sort(key = lambda move: previous.get(move, -1e40), reverse = True)
+            self.root_scores = {}
+        return moves
+
+
+
+    def ordered_moves(self, first_move, ply):
+        # Transposition table move first, then killer moves, then pawn moves,
+        # then walls with the best history first
+        pawn_moves = []
+        walls = []
+        for move in self.generate_all_moves():
+            if move < NUM_DIRECTIONS:
+                pawn_moves.append(move)
+            else:
+                walls.append(move)
+        if self.history:
+            history = self.history
+            walls.sort(key = lambda move: history.get(move, 0), reverse = True)
+        moves = pawn_moves + walls
+
+        front = []
+        if first_move is not None and first_move in moves:
+            front.append(first_move)
+        for killer in self.killers.get(ply, ()):
+            if killer is not None and killer not in front and killer in moves:
+                front.append(killer)
+        if not front:
+            return moves
+        return front + [move for move in moves if move not in front]
+    
                 
     
     def generate_all_moves(self):
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
-        walls_pos = [(i+1.5, j+1.5) for i in range(8) for j in range(8)]
-        for dir in directions:
-            yield "move", dir
-
-        for wall_pos in walls_pos:
-            yield "wall", (wall_pos, "vertical")
-            yield "wall", (wall_pos, "horizontal")
+        # Codes of the legal actions of the player to move, so play never fails
+        return self.game.legal_codes()
 
 
 
@@ -116,45 +395,12 @@ class nMiniMaxPruningBot:
 
 
     def hash_game_state(self, game):
-        # Initialize an empty string
-        hash_string = ''
-
-        # Add player positions
-        for player in game.players:
-            hash_string += f'P{player.player_id}:{player.pos}'
-
-        # Add walls
-        for wall in sorted(game.walls):
-            hash_string += f'W:{wall}'
-
-        # Add current player
-        hash_string += f'Current:{game.cur_player}'
-
-        # Use a hash function (e.g., hash(), md5, etc.)
-        return hash(hash_string)  # Simple Python hash function
+        # Zobrist key kept up to date by the game itself, combined with the move count
+        return game.zobrist ^ PLY_KEYS[len(game.actions) % len(PLY_KEYS)]
     
 
 
     def num_strategic_moves(self, game, player):
-        count = 0
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Immediate moves only
-        wall_positions = self.strategic_wall_positions(player)  # A subset of wall positions
-
-        for dir in directions:
-            if game.is_legal_move(player, dir):
-                count += 1
-
-        for wall_pos in wall_positions:
-            if game.is_legal_wall(player, wall_pos, "vertical", undo_successful_wall=True):
-                count += 1
-            if game.is_legal_wall(player, wall_pos, "horizontal", undo_successful_wall=True):
-                count += 1
-
-        return count
-
-
-
-    def strategic_wall_positions(self, player):
-        # Example: Return wall positions near the player and along central paths
-        x, y = player.pos
-        return [(x + dx, y + dy) for dx in range(-1, 2) for dy in range(-1, 2) if 1.5 <= x + dx <= 8.5 and 1.5 <= y + dy <= 8.5]
+        # The old count also tried walls at strategic_wall_positions, but those were whole-square
+        # coordinates that are never wall centers, so it always came down to the pawn moves
+        return game.mobility(player)
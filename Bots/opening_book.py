@@ -0,0 +1,228 @@
+# OPENING BOOK #
+# Best moves for the positions near the start of the game, found offline with a deep search #
+# and stored in a sorted file of fixed size records that is binary searched through mmap. #
+# Positions that mirror each other left to right share one record. Example:                #
+#   python Bots/opening_book.py build --plies 4 --depth 4 --width 3 --output book.bin        #
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Implementation'))
+from v1 import (Game, SQUARE_INDEX, WALL_SLOTS, DIRECTIONS, DIRECTION_ORDER, NUM_ACTIONS,
+                ZOBRIST_PAWN, ZOBRIST_WALL, ZOBRIST_WALLS_LEFT, ZOBRIST_SIDE, encode_action, decode_action)
+
+MAGIC = b"QBOOK\x00\x01\x00"
+RECORD = struct.Struct("<QH") # canonical Zobrist key, action code
+
+# Left to right mirror images of the squares, wall slots and action codes
+MIRROR_SQUARE = tuple(8 - sq % 9 + 9 * (sq // 9) for sq in range(81))
+MIRROR_SLOT = tuple(7 - slot % 8 + 8 * (slot // 8) for slot in range(64))
+MIRROR_ACTION = tuple(
+    DIRECTION_ORDER[-DIRECTIONS[code][0], DIRECTIONS[code][1]] if code < len(DIRECTIONS)
+    else len(DIRECTIONS) + 2 * MIRROR_SLOT[(code - len(DIRECTIONS)) // 2] + (code - len(DIRECTIONS)) % 2
+    for code in range(NUM_ACTIONS)
+)
+
+
+
+def mirror_zobrist(game):
+    '''
+    Returns the Zobrist key the game would have with the board
+    mirrored left to right.
+
+    game:   Game to compute the key for (Game)
+    '''
+    key = ZOBRIST_SIDE if game.cur_player else 0
+    for player in game.players:
+        key ^= ZOBRIST_PAWN[player.player_id][MIRROR_SQUARE[SQUARE_INDEX[player.pos]]]
+        key ^= ZOBRIST_WALLS_LEFT[player.player_id][player.remaining_walls]
+    for pos, orientation in game.walls:
+        key ^= ZOBRIST_WALL[MIRROR_SLOT[WALL_SLOTS[pos]], orientation]
+    return key
+
+
+
+def canonical_key(game):
+    '''
+    Returns (key, mirrored) where key is the smaller of the Zobrist
+    keys of the position and of its mirror image, and mirrored
+    tells whether it belongs to the mirror image.
+
+    game:   Game to compute the key for (Game)
+    '''
+    mirrored = mirror_zobrist(game)
+    if mirrored < game.zobrist:
+        return mirrored, True
+    return game.zobrist, False
+
+
+
+class OpeningBook:
+    def __init__(self, path):
+        '''
+        Read-only opening book backed by a memory-mapped file.
+
+        path:   Book file written by write_book (str)
+        '''
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ) if size else b""
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.count = (size - len(MAGIC)) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup_code(self, key):
+        '''
+        Binary searches the book for a canonical key and returns
+        the stored action code, or None.
+
+        key:    Canonical Zobrist key (int)
+        '''
+        data = self.data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, code = RECORD.unpack_from(data, len(MAGIC) + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return code
+        return None
+
+    def lookup(self, game):
+        '''
+        Returns the book move for the current position of a game as
+        (action_type, action), or None if the position is not in
+        the book.
+
+        game:   Game to look up (Game)
+        '''
+        key, mirrored = canonical_key(game)
+        code = self.lookup_code(key)
+        if code is None:
+            return None
+        return decode_action(MIRROR_ACTION[code] if mirrored else code)
+
+
+
+def open_book(book):
+    '''
+    Returns an OpeningBook for a path, passes an OpeningBook
+    through, and returns None for None.
+
+    book:   Path of a book file, an OpeningBook or None
+    '''
+    if book is None or isinstance(book, OpeningBook):
+        return book
+    return OpeningBook(book)
+
+
+
+def write_book(path, entries):
+    '''
+    Writes a book file holding the given moves, sorted by key.
+
+    path:       File to write (str)
+    entries:    Canonical Zobrist key -> action code (dict)
+    '''
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for key in sorted(entries):
+            f.write(RECORD.pack(key, entries[key]))
+
+
+
+def build_book(plies, depth, width, time_limit = None, bot_options = None, progress = None):
+    '''
+    Searches the opening tree and returns the best move of every
+    position in it as {canonical key: action code}. The tree holds
+    every position reached in fewer than plies actions where each
+    action is one of the width best moves of the previous position,
+    so both the moves the bots will play and the likely replies to
+    them are covered.
+
+    plies:          Depth of the opening tree (int)
+    depth:          Search depth for every position (int)
+    width:          Moves followed from each position (int)
+    time_limit:     Seconds per position, or None to always complete
+                    the search to depth (float)
+    bot_options:    Keyword arguments for nMiniMaxPruningBot (dict)
+    progress:       Called with the number of positions searched (callable)
+    '''
+    from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+
+    game = Game()
+    bots = [nMiniMaxPruningBot(game, player_id, depth, **(bot_options or {})) for player_id in range(2)]
+    entries = {}
+
+    def visit():
+        if len(game.actions) >= plies or game.winner is not None:
+            return
+        key, mirrored = canonical_key(game)
+        if key in entries:
+            return
+        bot = bots[game.cur_player]
+        _, best_move = bot.choose_move(time_limit = time_limit, max_depth = depth)
+        code = encode_action(*best_move)
+        entries[key] = MIRROR_ACTION[code] if mirrored else code
+        if progress is not None:
+            progress(len(entries))
+
+        scores = bot.root_scores # keyed by action code
+        others = sorted((move for move in scores if move != code), key = lambda move: -scores[move])
+        for move in [code] + others[:width - 1]:
+            game.play(move)
+            visit()
+            game.undo()
+
+    visit()
+    return entries
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Build or query an opening book")
+    commands = parser.add_subparsers(dest = "command", required = True)
+    build = commands.add_parser("build", help = "search the opening tree and write a book")
+    build.add_argument("--plies", type = int, default = 4)
+    build.add_argument("--depth", type = int, default = 4)
+    build.add_argument("--width", type = int, default = 3)
+    build.add_argument("--time-limit", type = float, default = None, help = "seconds per position")
+    build.add_argument("--output", default = "opening_book.bin")
+    show = commands.add_parser("show", help = "print the book move of the starting position and the book size")
+    show.add_argument("book")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        def progress(count):
+            print(f"\r{count} positions, {time.perf_counter() - start:.0f}s", end = "", file = sys.stderr, flush = True)
+        entries = build_book(args.plies, args.depth, args.width, args.time_limit, progress = progress)
+        print(file = sys.stderr)
+        write_book(args.output, entries)
+        print(f"wrote {len(entries)} positions to {args.output}")
+    else:
+        with OpeningBook(args.book) as book:
+            print(f"{len(book)} positions, start position: {book.lookup(Game())}")
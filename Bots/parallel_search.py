@@ -0,0 +1,219 @@
+# ROOT-PARALLEL SEARCH FOR nMiniMaxPruningBot #
+# The root moves are split across a pool of worker processes that each replay the game #
+# into their own Game copy and search their share of the moves with their own table #
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Implementation'))
+from v1 import Game, ACTIONS
+from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot, NULL_WINDOW
+from transposition_table import TranspositionTable
+
+worker_tables = {} # player_id -> transposition table owned by a worker process, kept between tasks
+worker_tt_size = None
+
+
+
+def init_worker(tt_size):
+    global worker_tt_size
+    worker_tt_size = tt_size
+    worker_tables.clear()
+
+
+
+def worker_table(player_id):
+    # Table scores are from the searching bot's point of view, so each side needs its own table
+    table = worker_tables.get(player_id)
+    if table is None:
+        table = worker_tables[player_id] = TranspositionTable(worker_tt_size)
+    return table
+
+
+
+def replay(codes):
+    '''
+    Rebuilds a game by playing a list of action codes from
+    the starting position.
+
+    codes:  Action codes as stored in Game.codes (list)
+    '''
+    game = Game()
+    for code in codes:
+        game.play(code)
+    return game
+
+
+
+def search_root_moves(task):
+    '''
+    Searches a share of the root moves in a worker. Returns the
+    score of every move and the number of nodes visited. Scores
+    are exact for every move at least as good as alpha.
+
+    task:   (codes, player_id, bot_options, depth, alpha, moves) with
+            the game and the moves given as action codes
+    '''
+    codes, player_id, bot_options, depth, alpha, moves = task
+    game = replay(codes)
+    bot = nMiniMaxPruningBot(game, player_id, depth, **bot_options)
+    if worker_tt_size is not None:
+        bot.tt = worker_table(player_id)
+    bot.tt.new_search()
+    bot.root_ply = len(game.actions)
+    results = []
+    for move in moves:
+        game.play(move)
+        score, _ = bot.minimax(alpha - NULL_WINDOW, 1e20, game, depth - 1, False)
+        game.undo()
+        results.append((move, score))
+        alpha = max(alpha, score)
+    return results, bot.nodes
+
+
+
+class ParallelSearch:
+    def __init__(self, workers, bot_options = None, tt_size = 1 << 18):
+        '''
+        Pool of worker processes for searching the root moves of
+        nMiniMaxPruningBot in parallel.
+
+        workers:        Number of worker processes (int)
+        bot_options:    Keyword arguments for the bots the workers
+                        search with (dict)
+        tt_size:        Size of each worker's transposition table (int)
+        '''
+        self.workers = workers
+        self.bot_options = dict(bot_options or {})
+        self.tt_size = tt_size
+        self.pool = multiprocessing.Pool(workers, initializer = init_worker, initargs = (tt_size,))
+        self.master = None
+        self.nodes = 0
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def choose_move(self, game, player_id, depth):
+        '''
+        Searches the game to a fixed depth with iterative deepening
+        and returns (score, move) for the player to move.
+
+        At every depth the first move in order is searched here to
+        get a bound, and the remaining moves are dealt out to the
+        workers. Every move at least as good as that bound gets an
+        exact score, so the best move is the one with the highest
+        score, with ties broken by the order moves are generated in,
+        the same as the serial search.
+
+        game:       Game to search, left unchanged (Game)
+        player_id:  Player to move (int)
+        depth:      Depth to search to (int)
+        '''
+        if self.master is None or self.master.game is not game or self.master.player_id != player_id:
+            self.master = nMiniMaxPruningBot(game, player_id, depth, tt_size = self.tt_size, **self.bot_options)
+        master = self.master
+        master.tt.new_search()
+        master.root_ply = len(game.actions)
+        master.nodes = 0
+        self.nodes = 0
+
+        moves = list(game.legal_codes())
+        index = {move: i for i, move in enumerate(moves)}
+        scores = {}
+        best = None
+        for d in range(1, depth + 1):
+            order = sorted(moves, key = lambda move: scores.get(move, -1e40), reverse = True) if scores else moves
+            first = order[0]
+            game.play(first)
+            first_score, _ = master.minimax(-1e20, 1e20, game, d - 1, False)
+            game.undo()
+
+            rest = order[1:]
+            tasks = [(list(game.codes), player_id, self.bot_options, d, first_score, rest[i::self.workers])
+                     for i in range(self.workers) if rest[i::self.workers]]
+            scores = {first: first_score}
+            for results, nodes in self.pool.map(search_root_moves, tasks):
+                scores.update(results)
+                self.nodes += nodes
+
+            best_move = max(moves, key = lambda move: (scores[move], -index[move]))
+            best = (scores[best_move], ACTIONS[best_move])
+        self.nodes += master.nodes
+        return best
+
+
+
+def random_position(plies, seed):
+    '''
+    Plays random legal actions from the starting position to
+    get a reproducible test position.
+
+    plies:  Number of actions to play (int)
+    seed:   Random seed (int)
+    '''
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(plies):
+        if game.winner is not None:
+            break
+        actions = list(game.legal_actions())
+        moves = [action for action in actions if action[0] == "move"]
+        action_type, action = rng.choice(moves if rng.random() < 0.5 else actions)
+        game.perform_action(game.players[game.cur_player], action_type, action)
+    return game
+
+
+
+def benchmark(game, depth, worker_counts, bot_options = None):
+    '''
+    Times the serial search against the parallel search for each
+    number of workers on the same position and depth, and checks
+    that they choose the same move.
+
+    game:           Position to search (Game)
+    depth:          Depth to search to (int)
+    worker_counts:  Numbers of workers to try (list of int)
+    bot_options:    Keyword arguments for the bots (dict)
+    '''
+    bot_options = dict(bot_options or {})
+    bot = nMiniMaxPruningBot(game, game.cur_player, depth, **bot_options)
+    start = time.perf_counter()
+    serial_score, serial_move = bot.choose_move(max_depth = depth)
+    serial_time = time.perf_counter() - start
+    rows = [{"workers": 0, "seconds": serial_time, "speedup": 1.0, "nodes": bot.nodes,
+             "score": serial_score, "move": serial_move, "same_move": True}]
+
+    for workers in worker_counts:
+        with ParallelSearch(workers, bot_options) as search:
+            start = time.perf_counter()
+            score, move = search.choose_move(game, game.cur_player, depth)
+            seconds = time.perf_counter() - start
+        rows.append({"workers": workers, "seconds": seconds, "speedup": serial_time / seconds, "nodes": search.nodes,
+                     "score": score, "move": move, "same_move": move == serial_move})
+    return rows
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark root-parallel search against the serial search")
+    parser.add_argument("--depth", type = int, default = 3)
+    parser.add_argument("--workers", type = int, nargs = "+", default = [1, 2, 4, 8])
+    parser.add_argument("--plies", type = int, default = 6, help = "random actions played to reach the test position")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    game = random_position(args.plies, args.seed)
+    print("workers  seconds  speedup      nodes  same move  move")
+    for row in benchmark(game, args.depth, args.workers):
+        print(f"{row['workers']:>7}  {row['seconds']:7.2f}  {row['speedup']:7.2f}  {row['nodes']:>9}  {str(row['same_move']):>9}  {row['move']}")
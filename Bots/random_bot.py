@@ -24,12 +24,15 @@ class RandomBot:
 
     def make_move_decision(self):
         # Example: Move towards the goal
-        directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
+        directions = self.game.legal_pawn_moves(self.bot)
+        if not directions:
+            return False
         direction = random.choice(directions)
         return self.game.perform_action(self.bot, "move", direction)
 
     def make_wall_decision(self):
         # Example: Place a wall randomly
-        wall_position = (math.ceil(8*random.uniform(0, 1))+0.5, math.ceil(8*random.uniform(0, 1))+0.5)
-        wall_orientation = random.choice(["horizontal", "vertical"])
-        return self.game.perform_action(self.bot, "wall", (wall_position, wall_orientation))
\ No newline at end of file
+        walls = [action for action_type, action in self.game.legal_actions(self.bot) if action_type == "wall"]
+        if not walls:
+            return False
+        return self.game.perform_action(self.bot, "wall", random.choice(walls))
\ No newline at end of file
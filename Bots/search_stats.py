@@ -0,0 +1,73 @@
+# SEARCH STATISTICS #
+
+import json
+
+class SearchStats:
+    def __init__(self):
+        '''
+        Statistics of a single make_move search. The bots fill it
+        in from counters they keep anyway, so collecting it adds
+        no work inside the search itself.
+        '''
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.tt_hits = 0
+        self.tt_probes = 0
+        self.cutoffs = {} # ply -> number of cutoffs
+        self.first_move_cutoffs = {} # ply -> number of cutoffs by the first move tried
+        self.depths = [] # (depth, seconds, nodes) for every completed iteration
+        self.principal_variation = []
+        self.completed_depth = 0
+        self.best_score = None
+        self.best_move = None
+        self.elapsed = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def effective_branching_factor(self):
+        # Growth in nodes between the last two iterations, or the depth-th
+        # root of the node count when there was only one iteration
+        if len(self.depths) >= 2 and self.depths[-2][2]:
+            return self.depths[-1][2] / self.depths[-2][2]
+        if self.completed_depth:
+            return self.nodes ** (1 / self.completed_depth)
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "leaf_evaluations": self.leaf_evaluations,
+            "nodes_per_second": self.nodes_per_second,
+            "tt_hits": self.tt_hits,
+            "tt_probes": self.tt_probes,
+            "cutoffs": dict(sorted(self.cutoffs.items())),
+            "first_move_cutoffs": dict(sorted(self.first_move_cutoffs.items())),
+            "effective_branching_factor": self.effective_branching_factor,
+            "depths": [{"depth": depth, "seconds": seconds, "nodes": nodes} for depth, seconds, nodes in self.depths],
+            "principal_variation": self.principal_variation,
+            "completed_depth": self.completed_depth,
+            "best_score": self.best_score,
+            "best_move": self.best_move,
+            "elapsed": self.elapsed,
+        }
+
+    def __repr__(self):
+        return (f"SearchStats(depth={self.completed_depth}, score={self.best_score}, move={self.best_move}, "
+                f"nodes={self.nodes}, nps={self.nodes_per_second:.0f}, ebf={self.effective_branching_factor:.2f})")
+
+
+
+def json_lines_sink(file):
+    '''
+    Returns a log sink that writes every SearchStats it gets to
+    an open text file as one line of JSON.
+
+    file:   File to write to (text file)
+    '''
+    def sink(stats):
+        file.write(json.dumps(stats.as_dict()) + "\n")
+        file.flush()
+    return sink
@@ -0,0 +1,92 @@
+# TRANSPOSITION TABLE #
+
+EXACT = 0
+LOWER = 1 # score is a lower bound (the search failed high)
+UPPER = 2 # score is an upper bound (the search failed low)
+
+class TranspositionTable:
+    def __init__(self, size = 1 << 18):
+        '''
+        Fixed size table of search results indexed by the Zobrist
+        key of a state. Each slot holds one entry of the form
+        (key, depth, flag, score, best_move, generation).
+
+        size:   Number of slots, which bounds the memory used (int)
+        '''
+        self.size = size
+        self.entries = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        '''
+        Marks the start of a new search. Entries from earlier
+        searches are kept and can still be probed, but are the
+        first to be replaced.
+        '''
+        self.generation += 1
+
+    def probe(self, key):
+        '''
+        Returns the entry stored for a key, or None. A slot
+        holding a different key counts as a collision.
+
+        key:    Zobrist key of the state (int)
+        '''
+        entry = self.entries[key % self.size]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, flag, score, best_move):
+        '''
+        Stores a search result. A slot already holding a deeper
+        result from the current search is left alone, anything
+        else (empty, stale or shallower) is replaced.
+
+        key:        Zobrist key of the state (int)
+        depth:      Remaining depth the score was searched to (int)
+        flag:       EXACT, LOWER or UPPER
+        score:      Score of the state (float)
+        best_move:  Best action found, or None
+        '''
+        index = key % self.size
+        old = self.entries[index]
+        if old is not None:
+            if old[5] == self.generation and old[1] > depth:
+                return
+            if old[0] != key:
+                self.replacements += 1
+        self.entries[index] = (key, depth, flag, score, best_move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        '''
+        Empties the table, keeping the counters.
+        '''
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def stats(self):
+        '''
+        Returns the table counters and how many slots are filled.
+        '''
+        filled = self.size - self.entries.count(None)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "filled": filled,
+            "size": self.size,
+        }
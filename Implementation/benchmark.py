@@ -0,0 +1,397 @@
+# ENGINE BENCHMARKS #
+# Times the core Game operations on a fixed corpus of positions and counts legal action #
+# sequences with perft. Results are written as JSON and can be compared with a stored   #
+# baseline to catch regressions. Examples:                                              #
+#   python benchmark.py run --output baseline.json                                      #
+#   python benchmark.py run --baseline baseline.json                                    #
+#   python benchmark.py perft 2 --position 3 --check                                    #
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from v1 import Game, DIRECTIONS, WALL_ACTIONS
+
+# Positions as the actions leading to them from the start, kept as explicit
+# lists so that the corpus does not change when move generation does
+CORPUS = [
+    [],
+    [
+        ('wall', ((3.5, 7.5), 'vertical')), ('move', (0, -1)), ('wall', ((2.5, 5.5), 'horizontal')),
+        ('move', (1, 0)), ('wall', ((5.5, 5.5), 'horizontal')), ('move', (0, 1)),
+    ],
+    [
+        ('wall', ((2.5, 7.5), 'horizontal')), ('move', (0, -1)), ('move', (1, 0)), ('move', (-1, 0)),
+        ('move', (1, 0)), ('move', (0, -1)), ('move', (1, 0)), ('wall', ((4.5, 6.5), 'horizontal')),
+        ('move', (0, 1)), ('move', (1, 0)), ('move', (0, -1)), ('move', (0, 1)),
+    ],
+    [
+        ('wall', ((5.5, 1.5), 'vertical')), ('move', (0, -1)), ('move', (-1, 0)),
+        ('wall', ((8.5, 1.5), 'vertical')), ('move', (1, 0)), ('wall', ((4.5, 8.5), 'vertical')),
+        ('wall', ((3.5, 7.5), 'horizontal')), ('wall', ((6.5, 3.5), 'vertical')),
+        ('wall', ((1.5, 8.5), 'vertical')), ('move', (0, -1)), ('wall', ((3.5, 1.5), 'vertical')),
+        ('move', (0, 1)), ('wall', ((5.5, 4.5), 'horizontal')), ('move', (0, 1)),
+        ('wall', ((8.5, 4.5), 'horizontal')), ('wall', ((1.5, 2.5), 'horizontal')),
+        ('wall', ((6.5, 6.5), 'vertical')), ('move', (0, -1)),
+    ],
+    [
+        ('move', (-1, 0)), ('move', (0, -1)), ('move', (1, 0)), ('wall', ((6.5, 6.5), 'horizontal')),
+        ('move', (0, 1)), ('wall', ((4.5, 5.5), 'vertical')), ('move', (1, 0)), ('move', (-1, 0)),
+        ('move', (-1, 0)), ('wall', ((7.5, 1.5), 'vertical')), ('move', (1, 0)),
+        ('wall', ((2.5, 1.5), 'horizontal')), ('move', (-1, 0)), ('move', (1, 0)),
+        ('wall', ((6.5, 4.5), 'horizontal')), ('move', (-1, 0)), ('move', (0, 1)), ('move', (-1, 0)),
+        ('wall', ((3.5, 4.5), 'horizontal')), ('wall', ((3.5, 5.5), 'horizontal')), ('move', (-1, 0)),
+        ('move', (0, 1)), ('move', (-1, 0)), ('wall', ((4.5, 1.5), 'horizontal')),
+    ],
+    [
+        ('wall', ((8.5, 4.5), 'vertical')), ('wall', ((2.5, 4.5), 'horizontal')),
+        ('wall', ((1.5, 1.5), 'horizontal')), ('wall', ((6.5, 8.5), 'horizontal')), ('move', (0, 1)),
+        ('wall', ((4.5, 6.5), 'vertical')), ('move', (1, 0)), ('wall', ((6.5, 3.5), 'vertical')),
+        ('wall', ((8.5, 1.5), 'horizontal')), ('wall', ((3.5, 5.5), 'vertical')),
+        ('wall', ((7.5, 3.5), 'horizontal')), ('wall', ((1.5, 2.5), 'horizontal')),
+        ('wall', ((5.5, 5.5), 'vertical')), ('wall', ((1.5, 4.5), 'vertical')), ('move', (-1, 0)),
+        ('move', (1, 0)), ('wall', ((6.5, 4.5), 'horizontal')), ('move', (1, 0)),
+        ('wall', ((4.5, 2.5), 'vertical')), ('wall', ((2.5, 6.5), 'horizontal')),
+        ('wall', ((1.5, 7.5), 'vertical')), ('wall', ((3.5, 3.5), 'horizontal')),
+        ('wall', ((5.5, 7.5), 'horizontal')), ('move', (1, 0)), ('wall', ((3.5, 1.5), 'horizontal')),
+        ('wall', ((5.5, 3.5), 'horizontal')), ('move', (0, -1)), ('move', (-1, 0)), ('move', (1, 0)),
+        ('move', (-1, 0)),
+    ],
+]
+
+
+
+def load_position(actions):
+    '''
+    Plays a list of actions from the starting position.
+
+    actions:    Actions as stored in Game.actions (list)
+    '''
+    game = Game()
+    for action_type, action in actions:
+        if not game.perform_action(game.players[game.cur_player], action_type, action):
+            raise ValueError(f"illegal action in corpus: {(action_type, action)}")
+    return game
+
+
+
+def perft(game, depth):
+    '''
+    Counts the sequences of legal actions of the given length from
+    the current position. Sequences end early when a player wins,
+    and such sequences are not counted.
+
+    game:   Position to count from, left unchanged (Game)
+    depth:  Number of actions per sequence (int)
+    '''
+    if depth == 0:
+        return 1
+    if game.winner is not None:
+        return 0
+    player = game.players[game.cur_player]
+    if depth == 1:
+        return sum(1 for _ in game.legal_actions(player))
+    count = 0
+    for action_type, action in list(game.legal_actions(player)):
+        game.perform_action(player, action_type, action)
+        count += perft(game, depth - 1)
+        game.undo_last_move()
+    return count
+
+
+
+def wall_overlaps(walls, pos, orientation):
+    '''
+    Checks whether a wall would cross or overlap one of the placed
+    walls, working from the wall centers alone.
+
+    walls:          Placed walls as (position, orientation) (set)
+    pos:            Position of center of wall (float, float)
+    orientation:    "horizontal" or "vertical" (str)
+    '''
+    x, y = pos
+    if (pos, "horizontal") in walls or (pos, "vertical") in walls:
+        return True
+    if orientation == "horizontal":
+        return ((x - 1, y), orientation) in walls or ((x + 1, y), orientation) in walls
+    return ((x, y - 1), orientation) in walls or ((x, y + 1), orientation) in walls
+
+
+
+def blocked_steps(walls):
+    # Set of the (square, square) steps the walls block, in both directions
+    steps = set()
+    for (cx, cy), orientation in walls:
+        x, y = int(cx - 0.5), int(cy - 0.5)
+        if orientation == "horizontal":
+            pairs = [((x, y), (x, y + 1)), ((x + 1, y), (x + 1, y + 1))]
+        else:
+            pairs = [((x, y), (x + 1, y)), ((x, y + 1), (x + 1, y + 1))]
+        for a, b in pairs:
+            steps.add((a, b))
+            steps.add((b, a))
+    return steps
+
+
+
+def reaches_row(start, row, blocked):
+    '''
+    Uses BFS to check whether a row can be reached from a square,
+    ignoring the pawns.
+
+    start:      Position to start from (int, int)
+    row:        Row to reach (int)
+    blocked:    Steps blocked by walls, see blocked_steps (set)
+    '''
+    visited = {start}
+    queue = [start]
+    for x, y in queue:
+        if y == row:
+            return True
+        for step in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 1 <= step[0] <= 9 and 1 <= step[1] <= 9 and step not in visited and ((x, y), step) not in blocked:
+                visited.add(step)
+                queue.append(step)
+    return False
+
+
+
+def perft_by_trial(game, depth):
+    '''
+    Same count as perft, but decides which actions are legal without
+    the move generator: pawn directions with Game.is_legal_move, and
+    walls with wall_overlaps and a BFS from each pawn over the walls
+    as placed. Used as an independent correctness check. Raises
+    ValueError if perform_action refuses an action found legal.
+
+    game:   Position to count from, left unchanged (Game)
+    depth:  Number of actions per sequence (int)
+    '''
+    if depth == 0:
+        return 1
+    if game.winner is not None:
+        return 0
+    player = game.players[game.cur_player]
+    candidates = [("move", dir) for dir in DIRECTIONS if game.is_legal_move(player, dir)]
+    if player.remaining_walls > 0:
+        blocked = blocked_steps(game.walls)
+        for action, _ in WALL_ACTIONS:
+            if wall_overlaps(game.walls, *action):
+                continue
+            wall_blocked = blocked | blocked_steps([action])
+            if all(reaches_row(p.pos, 9 - 8 * p.player_id, wall_blocked) for p in game.players):
+                candidates.append(("wall", action))
+    if depth == 1:
+        return len(candidates)
+    count = 0
+    for action_type, action in candidates:
+        if not game.perform_action(player, action_type, action):
+            raise ValueError(f"perform_action refused legal action {(action_type, action)} after {game.actions}")
+        count += perft_by_trial(game, depth - 1)
+        game.undo_last_move()
+    return count
+
+
+
+def time_call(function, min_time):
+    # Best time per call over repeated runs lasting at least min_time seconds in total
+    best = float("inf")
+    calls = 0
+    total = 0.0
+    while total < min_time or calls < 3:
+        start = time.perf_counter()
+        count = function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed / count)
+        total += elapsed
+        calls += 1
+    return best
+
+
+
+def bench_perform_undo(games):
+    actions = [list(game.legal_actions()) for game in games]
+    def run():
+        count = 0
+        for game, game_actions in zip(games, actions):
+            player = game.players[game.cur_player]
+            for action_type, action in game_actions:
+                game.perform_action(player, action_type, action)
+                game.undo_last_move()
+                count += 1
+        return count
+    return run
+
+
+
+def bench_is_legal_move(games):
+    def run():
+        for game in games:
+            player = game.players[game.cur_player]
+            for dir in DIRECTIONS:
+                game.is_legal_move(player, dir)
+        return len(games) * len(DIRECTIONS)
+    return run
+
+
+
+def bench_is_legal_wall(games):
+    def run():
+        for game in games:
+            player = game.players[game.cur_player]
+            for (pos, orientation), _ in WALL_ACTIONS:
+                game.is_legal_wall(player, pos, orientation, undo_successful_wall = True)
+        return len(games) * len(WALL_ACTIONS)
+    return run
+
+
+
+def bench_check_path_to_end(games, cold):
+    # cold clears the shortest path cache before every call so that A* always runs
+    def run():
+        for game in games:
+            for player in game.players:
+                if cold:
+                    game.path_cache = [None, None]
+                game.check_path_to_end(player)
+        return 2 * len(games)
+    return run
+
+
+
+def bench_legal_actions(games):
+    def run():
+        for game in games:
+            for _ in game.legal_actions():
+                pass
+        return len(games)
+    return run
+
+
+
+def bench_perft(game, depth):
+    def run():
+        perft(game, depth)
+        return 1
+    return run
+
+
+
+def run_benchmarks(min_time = 0.5, perft_depth = 2):
+    '''
+    Runs every benchmark on the corpus and returns the results as
+    a dict ready to be written as JSON. Timings are the best seconds
+    per call, and perft holds node counts and timings per position.
+
+    min_time:       Minimum total time spent on each benchmark (float)
+    perft_depth:    Depth of the perft runs (int)
+    '''
+    games = [load_position(actions) for actions in CORPUS]
+    timings = {
+        "perform_undo": time_call(bench_perform_undo(games), min_time),
+        "is_legal_move": time_call(bench_is_legal_move(games), min_time),
+        "is_legal_wall": time_call(bench_is_legal_wall(games), min_time),
+        "check_path_to_end": time_call(bench_check_path_to_end(games, cold = False), min_time),
+        "check_path_to_end_cold": time_call(bench_check_path_to_end(games, cold = True), min_time),
+        "legal_actions": time_call(bench_legal_actions(games), min_time),
+    }
+    perft_results = []
+    for i, game in enumerate(games):
+        nodes = perft(game, perft_depth)
+        seconds = time_call(bench_perft(game, perft_depth), min_time)
+        perft_results.append({"position": i, "depth": perft_depth, "nodes": nodes, "seconds": seconds,
+                              "nodes_per_second": nodes / seconds})
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "timings": timings,
+        "perft": perft_results,
+    }
+
+
+
+def compare(results, baseline, threshold = 0.10):
+    '''
+    Compares results with a baseline and returns a list of problems:
+    timings more than threshold slower than the baseline, and perft
+    node counts that differ from it.
+
+    results:    Output of run_benchmarks (dict)
+    baseline:   Output of run_benchmarks from an earlier run (dict)
+    threshold:  Allowed slowdown as a fraction (float)
+    '''
+    problems = []
+    for name, seconds in results["timings"].items():
+        old = baseline["timings"].get(name)
+        if old and seconds > old * (1 + threshold):
+            problems.append(f"{name}: {seconds * 1e6:.2f}us per call, baseline {old * 1e6:.2f}us ({seconds / old - 1:+.0%})")
+    old_perft = {(p["position"], p["depth"]): p for p in baseline.get("perft", [])}
+    for p in results["perft"]:
+        old = old_perft.get((p["position"], p["depth"]))
+        if old is None:
+            continue
+        if p["nodes"] != old["nodes"]:
+            problems.append(f"perft position {p['position']} depth {p['depth']}: {p['nodes']} nodes, baseline {old['nodes']}")
+        elif p["seconds"] > old["seconds"] * (1 + threshold):
+            problems.append(f"perft position {p['position']} depth {p['depth']}: {p['seconds']:.3f}s, baseline {old['seconds']:.3f}s ({p['seconds'] / old['seconds'] - 1:+.0%})")
+    return problems
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the Game engine")
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    run_parser = subparsers.add_parser("run", help = "time the engine on the corpus")
+    run_parser.add_argument("--output", help = "write the results to this JSON file")
+    run_parser.add_argument("--baseline", help = "compare with the results in this JSON file")
+    run_parser.add_argument("--threshold", type = float, default = 0.10, help = "allowed slowdown against the baseline")
+    run_parser.add_argument("--min-time", type = float, default = 0.5, help = "seconds spent on each benchmark")
+    run_parser.add_argument("--perft-depth", type = int, default = 2)
+
+    perft_parser = subparsers.add_parser("perft", help = "count legal action sequences")
+    perft_parser.add_argument("depth", type = int)
+    perft_parser.add_argument("--position", type = int, default = 0, help = "index of the corpus position to start from")
+    perft_parser.add_argument("--check", action = "store_true", help = "also count with perft_by_trial, without the move generator")
+    args = parser.parse_args()
+
+    if args.command == "perft":
+        game = load_position(CORPUS[args.position])
+        start = time.perf_counter()
+        nodes = perft(game, args.depth)
+        seconds = time.perf_counter() - start
+        result = {"position": args.position, "depth": args.depth, "nodes": nodes, "seconds": seconds}
+        if args.check:
+            result["trial_nodes"] = perft_by_trial(game, args.depth)
+            result["match"] = result["trial_nodes"] == nodes
+        print(json.dumps(result))
+        return 0 if result.get("match", True) else 1
+
+    results = run_benchmarks(args.min_time, args.perft_depth)
+    for name, seconds in results["timings"].items():
+        print(f"{name:<24} {seconds * 1e6:10.2f} us/call", file = sys.stderr)
+    for p in results["perft"]:
+        print(f"perft position {p['position']} depth {p['depth']}: {p['nodes']} nodes in {p['seconds']:.3f}s", file = sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent = 1)
+    else:
+        print(json.dumps(results, indent = 1))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.threshold)
+        for problem in problems:
+            print("REGRESSION " + problem, file = sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# GOAL DISTANCE FIELDS #
+# Distances from every square to each player's goal row, computed with NumPy for a whole #
+# batch of wall masks at once. Like check_path_to_end, the pawns do not block each other. #
+
+import numpy as np
+
+from v1 import SQUARE_INDEX, WALL_EDGES, WALL_SLOTS
+
+UNREACHABLE = 255 # distance of squares that can not reach the goal row
+
+
+
+def edge_costs(masks):
+    '''
+    Unpacks Game.blocked masks into the cost of crossing every
+    edge, 1 for an open edge and UNREACHABLE for a blocked one.
+    Returns (up, right), int16 arrays of shape (n, 1, 9, 9)
+    indexed [mask, 1, y - 1, x - 1], where up holds the edge to
+    the square above and right the edge to the square on the right.
+
+    masks:  Wall masks as stored in Game.blocked (list of int)
+    '''
+    data = b"".join(mask.to_bytes(21, "little") for mask in masks)
+    bits = np.unpackbits(np.frombuffer(data, np.uint8).reshape(len(masks), 21), axis = 1, bitorder = "little")
+    blocked = bits[:, :162].reshape(len(masks), 2, 1, 9, 9)
+    costs = np.where(blocked, np.int16(UNREACHABLE), np.int16(1))
+    return costs[:, 0], costs[:, 1]
+
+
+
+def distance_fields(masks):
+    '''
+    Returns the distance from every square to the goal rows of
+    both players for every wall mask, as an array of shape
+    (n, 2, 81) indexed [mask, player_id, square]. Squares cut
+    off from a goal row get UNREACHABLE.
+
+    The fields are found with a breadth-first search that grows
+    out of the goal rows, relaxing all squares of all masks with
+    whole-array operations until nothing changes.
+
+    masks:  Wall masks as stored in Game.blocked (list of int)
+    '''
+    up, right = edge_costs(masks)
+    dist = np.full((len(masks), 2, 9, 9), UNREACHABLE, np.int16)
+    dist[:, 0, 8, :] = 0
+    dist[:, 1, 0, :] = 0
+    while True:
+        before = dist.copy()
+        np.minimum(dist[:, :, :-1, :], dist[:, :, 1:, :] + up[:, :, :-1, :], out = dist[:, :, :-1, :])
+        np.minimum(dist[:, :, 1:, :], dist[:, :, :-1, :] + up[:, :, :-1, :], out = dist[:, :, 1:, :])
+        np.minimum(dist[:, :, :, :-1], dist[:, :, :, 1:] + right[:, :, :, :-1], out = dist[:, :, :, :-1])
+        np.minimum(dist[:, :, :, 1:], dist[:, :, :, :-1] + right[:, :, :, :-1], out = dist[:, :, :, 1:])
+        if np.array_equal(dist, before):
+            break
+    np.minimum(dist, UNREACHABLE, out = dist)
+    return dist.reshape(len(masks), 2, 81)
+
+
+
+def path_lengths(masks, squares):
+    '''
+    Returns the shortest path length of both players to their
+    goal row for a batch of positions, as an array of shape
+    (n, 2). This is the batch version of check_path_to_end.
+    Positions that share a wall mask share its distance field.
+
+    masks:      Wall masks as stored in Game.blocked (list of int)
+    squares:    Square index of player 0 and player 1 in each
+                position (list of (int, int))
+    '''
+    unique = {}
+    rows = [unique.setdefault(mask, len(unique)) for mask in masks]
+    fields = distance_fields(list(unique))
+    squares = np.asarray(squares, np.intp).reshape(len(masks), 2)
+    return fields[np.asarray(rows, np.intp)[:, None], np.arange(2), squares]
+
+
+
+def child_positions(game, player, actions):
+    '''
+    Returns the wall mask and pawn squares of the position after
+    each action, without performing the actions, as a list of
+    (blocked, (square of player 0, square of player 1)).
+
+    game:       Game the actions are taken in (Game)
+    player:     Player taking the actions (Player)
+    actions:    Legal actions as (action_type, action) (list)
+    '''
+    squares = [SQUARE_INDEX[p.pos] for p in game.players]
+    x, y = player.pos
+    positions = []
+    for action_type, action in actions:
+        if action_type == "move":
+            child_squares = list(squares)
+            child_squares[player.player_id] = SQUARE_INDEX[(x + action[0], y + action[1])]
+            positions.append((game.blocked, tuple(child_squares)))
+        else:
+            pos, orientation = action
+            positions.append((game.blocked | WALL_EDGES[WALL_SLOTS[pos], orientation], tuple(squares)))
+    return positions
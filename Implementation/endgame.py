@@ -0,0 +1,218 @@
+# ENDGAME RACE SOLVER #
+# Once both players are out of walls the board never changes again, and the game is a race #
+# between the two pawns. Every position of the race is a (side to move, square of player 0, #
+# square of player 1) triple, so all 13122 of them are solved at once by retrograde analysis #
+# from the won positions, jumps included. Tables are cached per wall mask.                 #
+
+from collections import deque
+
+from v1 import SQUARE_INDEX, NEIGHBORS, STEPS, JUMPS
+
+NUM_STATES = 2 * 81 * 81
+CACHE_SIZE = 16 # race tables kept, one per wall mask
+
+race_tables = {} # wall mask -> RaceTable, oldest first
+
+
+
+def pawn_moves(sq, opponent, blocked):
+    '''
+    Returns the legal pawn moves from a square as (direction,
+    destination) pairs, following the same rules as
+    Game.legal_pawn_moves.
+
+    sq:         Square of the player to move (int)
+    opponent:   Square of the other player (int)
+    blocked:    Wall mask as stored in Game.blocked (int)
+    '''
+    moves = []
+    for dir, dest, edge in STEPS[sq]:
+        if blocked & edge:
+            continue
+        if dest != opponent:
+            moves.append((dir, dest))
+            continue
+        straight, diagonals = JUMPS[sq, opponent]
+        if straight is None:
+            continue
+        if not blocked & straight[2]:
+            moves.append(straight[:2])
+        else:
+            for diagonal_dir, diagonal_dest, diagonal_edge in diagonals:
+                if not blocked & diagonal_edge:
+                    moves.append((diagonal_dir, diagonal_dest))
+    return moves
+
+
+
+def goal_distances(blocked, goal_y):
+    # Breadth-first search from a goal row, ignoring the pawns
+    dist = [None] * 81
+    queue = deque(sq for sq in range(81) if sq // 9 == goal_y)
+    for sq in queue:
+        dist[sq] = 0
+    while queue:
+        sq = queue.popleft()
+        for neighbor, edge in NEIGHBORS[sq]:
+            if dist[neighbor] is None and not blocked & edge:
+                dist[neighbor] = dist[sq] + 1
+                queue.append(neighbor)
+    return dist
+
+
+
+class RaceTable:
+    def __init__(self, blocked):
+        '''
+        Solves every race position on a fixed board. A position is
+        indexed as cur_player * 6561 + square of player 0 * 81 +
+        square of player 1. Positions that are neither won nor lost
+        by perfect play are draws, where both players can keep the
+        other from ever winning.
+
+        winner[i] is the player who wins position i with perfect
+        play, or None for a draw, and plies[i] is how many actions
+        are left until they do, with the winner winning as quickly
+        and the loser losing as slowly as they can. A player with
+        no legal move loses, as they would forfeit.
+
+        blocked:    Wall mask as stored in Game.blocked (int)
+        '''
+        self.blocked = blocked
+        self.distances = (goal_distances(blocked, 8), goal_distances(blocked, 0))
+        self.winner = [None] * NUM_STATES
+        self.plies = [None] * NUM_STATES
+        self.successors = [()] * NUM_STATES
+        predecessors = [[] for _ in range(NUM_STATES)]
+        remaining = [0] * NUM_STATES
+        queue = deque()
+
+        for side in range(2):
+            for sq0 in range(81):
+                for sq1 in range(81):
+                    if sq0 == sq1:
+                        continue
+                    state = side * 6561 + sq0 * 81 + sq1
+                    # The previous mover wins as soon as they stand on their goal row
+                    if side == 1 and sq0 // 9 == 8 or side == 0 and sq1 // 9 == 0:
+                        self.winner[state] = 1 - side
+                        self.plies[state] = 0
+                        queue.append(state)
+                        continue
+                    if side == 0:
+                        moves = [(dir, 6561 + dest * 81 + sq1) for dir, dest in pawn_moves(sq0, sq1, blocked)]
+                    else:
+                        moves = [(dir, sq0 * 81 + dest) for dir, dest in pawn_moves(sq1, sq0, blocked)]
+                    self.successors[state] = tuple(moves)
+                    remaining[state] = len(moves)
+                    for _, successor in moves:
+                        predecessors[successor].append(state)
+                    if not moves:
+                        self.winner[state] = 1 - side
+                        self.plies[state] = 0
+                        queue.append(state)
+
+        # Positions come off the queue in order of plies, so a won position is first
+        # reached through its quickest win and a lost one through its slowest loss
+        while queue:
+            state = queue.popleft()
+            winner = self.winner[state]
+            plies = self.plies[state] + 1
+            for predecessor in predecessors[state]:
+                if self.winner[predecessor] is not None:
+                    continue
+                if predecessor // 6561 == winner:
+                    self.winner[predecessor] = winner
+                    self.plies[predecessor] = plies
+                    queue.append(predecessor)
+                else:
+                    remaining[predecessor] -= 1
+                    if remaining[predecessor] == 0:
+                        self.winner[predecessor] = winner
+                        self.plies[predecessor] = plies
+                        queue.append(predecessor)
+
+    def outcome(self, cur_player, sq0, sq1):
+        '''
+        Returns (winner, plies) for a position, with winner None
+        and plies None for a draw.
+
+        cur_player:     Player to move (int)
+        sq0:            Square of player 0 (int)
+        sq1:            Square of player 1 (int)
+        '''
+        state = cur_player * 6561 + sq0 * 81 + sq1
+        return self.winner[state], self.plies[state]
+
+    def best_move(self, cur_player, sq0, sq1):
+        '''
+        Returns the direction of the best pawn move in a position,
+        or None if there is no legal move. The winner takes the
+        quickest win and the loser the slowest loss. In a drawn
+        position the move keeps the draw and gets as close to the
+        goal row as it can.
+
+        cur_player:     Player to move (int)
+        sq0:            Square of player 0 (int)
+        sq1:            Square of player 1 (int)
+        '''
+        state = cur_player * 6561 + sq0 * 81 + sq1
+        distances = self.distances[cur_player]
+
+        def rank(move):
+            dir, successor = move
+            successor_winner = self.winner[successor]
+            dest = successor % 81 if cur_player else successor // 81 % 81
+            if successor_winner == cur_player:
+                return (0, self.plies[successor])
+            if successor_winner is None:
+                return (1, distances[dest] if distances[dest] is not None else 81)
+            return (2, -self.plies[successor])
+
+        moves = self.successors[state]
+        if not moves:
+            return None
+        return min(moves, key = rank)[0]
+
+
+
+def race_table(blocked):
+    '''
+    Returns the RaceTable of a wall mask, solving it the first
+    time it is asked for and keeping the CACHE_SIZE most recently
+    used tables.
+
+    blocked:    Wall mask as stored in Game.blocked (int)
+    '''
+    table = race_tables.pop(blocked, None)
+    if table is None:
+        table = RaceTable(blocked)
+        if len(race_tables) >= CACHE_SIZE:
+            del race_tables[next(iter(race_tables))]
+    race_tables[blocked] = table
+    return table
+
+
+
+def is_race(game):
+    # True once neither player can place a wall any more
+    return game.players[0].remaining_walls == 0 and game.players[1].remaining_walls == 0
+
+
+
+def solve(game):
+    '''
+    Solves a race position exactly. Returns (winner, plies, move)
+    where winner is None for a draw and move is the best action
+    for the player to move as ("move", direction), or None if the
+    game is over or a player still has walls left.
+
+    game:   Game to solve (Game)
+    '''
+    if not is_race(game) or game.winner is not None:
+        return None
+    table = race_table(game.blocked)
+    sq0, sq1 = (SQUARE_INDEX[player.pos] for player in game.players)
+    winner, plies = table.outcome(game.cur_player, sq0, sq1)
+    dir = table.best_move(game.cur_player, sq0, sq1)
+    return winner, plies, None if dir is None else ("move", dir)
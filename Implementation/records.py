@@ -0,0 +1,204 @@
+# GAME RECORDS #
+# Finished games are stored in an append-only file that starts with MAGIC and holds one #
+# record per game: a RECORD_HEADER of (winner, number of actions) followed by one byte per #
+# action, the action's code from encode_action. The winner byte is 2 for games without one. #
+# Actions can also be written in text notation: "e2" for a pawn move to square e2 and     #
+# "d8h" / "d8v" for a horizontal or vertical wall centered on the top right corner of d8.  #
+
+import mmap
+import os
+import struct
+
+from v1 import Game, decode_action
+
+MAGIC = b"QREC\x00\x01"
+RECORD_HEADER = struct.Struct("<BH")
+NO_WINNER = 2
+FILES = "abcdefghi"
+
+
+
+def action_to_notation(game, action_type, action):
+    '''
+    Returns the text notation of an action taken by the player to
+    move in the current position of a game.
+
+    game:           Game before the action is taken (Game)
+    action_type:    "move" or "wall" (str)
+    action:         Direction or (position, orientation)
+    '''
+    if action_type == "move":
+        x, y = game.players[game.cur_player].pos
+        return f"{FILES[x + action[0] - 1]}{y + action[1]}"
+    (cx, cy), orientation = action
+    return f"{FILES[int(cx - 0.5) - 1]}{int(cy - 0.5)}{orientation[0]}"
+
+
+
+def notation_to_action(game, text):
+    '''
+    Returns the action written as text for the player to move in
+    the current position of a game as (action_type, action). The
+    action is not checked for legality.
+
+    game:   Game the action is to be taken in (Game)
+    text:   Action in text notation, such as "e2" or "d8h" (str)
+    '''
+    text = text.strip().lower()
+    if len(text) not in (2, 3) or text[0] not in FILES or not text[1].isdigit() or text[1] == "0":
+        raise ValueError(f"bad action {text!r}")
+    x, y = FILES.index(text[0]) + 1, int(text[1])
+    if len(text) == 2:
+        px, py = game.players[game.cur_player].pos
+        return "move", (x - px, y - py)
+    orientation = {"h": "horizontal", "v": "vertical"}.get(text[2])
+    if orientation is None or x == 9 or y == 9:
+        raise ValueError(f"bad wall {text!r}")
+    return "wall", ((x + 0.5, y + 0.5), orientation)
+
+
+
+def replay(codes):
+    '''
+    Plays a sequence of action codes from the starting position
+    and returns the game.
+
+    codes:  Action codes (iterable of int, such as bytes)
+    '''
+    game = Game()
+    for code in codes:
+        if not game.play(code):
+            raise ValueError(f"illegal action {code} after {len(game.actions)} actions")
+    return game
+
+
+
+def to_notation(codes):
+    '''
+    Returns the actions of a game in text notation.
+
+    codes:  Action codes (iterable of int, such as bytes)
+    '''
+    game = Game()
+    moves = []
+    for code in codes:
+        action_type, action = decode_action(code)
+        moves.append(action_to_notation(game, action_type, action))
+        game.play(code)
+    return moves
+
+
+
+class RecordWriter:
+    def __init__(self, path):
+        '''
+        Appends game records to a file, creating it if needed.
+        Records are buffered, so close the writer (or use it as a
+        context manager) to make sure everything reaches the file.
+
+        path:   Record file (str)
+        '''
+        self.path = path
+        self.file = open(path, "ab")
+        size = self.file.tell()
+        # Drop a record cut off by an interrupted writer, or the games
+        # appended after it could no longer be read
+        try:
+            end = complete_size(path) if size > 0 else 0
+        except ValueError:
+            self.file.close()
+            raise
+        if end < size:
+            self.file.truncate(end)
+        if end == 0:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def write(self, codes, winner = None):
+        '''
+        Appends one game.
+
+        codes:      Action codes of the game (iterable of int)
+        winner:     Winning player, or None (int)
+        '''
+        codes = bytes(codes)
+        self.file.write(RECORD_HEADER.pack(NO_WINNER if winner is None else winner, len(codes)) + codes)
+        self.count += 1
+
+    def write_game(self, game):
+        '''
+        Appends a game with its actions and winner.
+
+        game:   Game to record (Game)
+        '''
+        self.write(game.codes, game.winner)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+def record_spans(data, size):
+    # Yields (winner byte, start, end) for every complete record in the mapped file
+    offset = len(MAGIC)
+    while offset + RECORD_HEADER.size <= size:
+        winner, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > size:
+            return
+        yield winner, start, start + length
+        offset = start + length
+
+
+
+def complete_size(path):
+    '''
+    Returns the size of a record file up to the end of its last
+    complete record, or 0 if it does not even hold all of MAGIC.
+
+    path:   Record file (str)
+    '''
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            if MAGIC.startswith(f.read()):
+                return 0
+            raise ValueError(f"{path} is not a game record file")
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+            end = len(MAGIC)
+            for _, _, end in record_spans(data, size):
+                pass
+            return end
+
+
+
+def read_records(path):
+    '''
+    Yields (winner, codes) for every game in a record file, with
+    winner None for games without one and codes a bytes object of
+    action codes. The file is memory-mapped and scanned in place,
+    so it is never loaded whole. A record cut off at the end of the
+    file, as left by an interrupted writer, is skipped.
+
+    path:   Record file (str)
+    '''
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+            for winner, start, end in record_spans(data, size):
+                yield (None if winner == NO_WINNER else winner), data[start:end]
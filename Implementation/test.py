@@ -1,5 +1,12 @@
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
 import unittest
-from v1 import Game
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Bots'))
+from v1 import Game, GameState, NUM_ACTIONS, WALL_CONFLICTS, WALL_CODE_EDGES, encode_action, decode_action
 
 class TestQuoridorGame(unittest.TestCase):
 
@@ -109,13 +116,436 @@ class TestQuoridorGame(unittest.TestCase):
         self.game.perform_action(p1, "wall", ((3.5,3.5), "horizontal"))
         self.game.undo_last_move()
         self.assertEqual(p0.remaining_walls, 9) #check that undo action returns wall
-        self.assertEqual(p1.remaining_walls, 10) 
+        self.assertEqual(p1.remaining_walls, 10)
+
+    def test_undo_wall_restores_edges(self):
+        p0, p1 = self.game.players
+        self.assertTrue(self.game.perform_action(p0, "wall", ((5.5,1.5), "vertical")))
+        self.assertFalse(self.game.has_edge((5,1), (6,1)))
+        self.assertFalse(self.game.has_edge((5,2), (6,2)))
+        self.assertTrue(self.game.undo_last_move())
+        self.assertTrue(self.game.has_edge((5,1), (6,1)))
+        self.assertTrue(self.game.has_edge((5,2), (6,2)))
+        self.assertEqual(self.game.blocked, 0)
+        self.assertEqual(self.game.wall_slots, 0)
+
+    def test_cached_path_after_wall_and_undo(self):
+        p0, p1 = self.game.players
+        self.assertEqual(self.game.check_path_to_end(p0), (True, 8))
+        self.assertTrue(self.game.perform_action(p0, "move", (0, 1)))
+        self.assertEqual(self.game.check_path_to_end(p0), (True, 7))
+        self.assertTrue(self.game.perform_action(p1, "wall", ((4.5,2.5), "horizontal")))
+        self.assertTrue(self.game.perform_action(p0, "wall", ((6.5,2.5), "horizontal")))
+        self.assertEqual(self.game.check_path_to_end(p0), (True, 9))
+        self.assertEqual(len(self.game.shortest_path(p0)), 10)
+        self.assertTrue(self.game.undo_last_move())
+        self.assertEqual(self.game.check_path_to_end(p0), (True, 8))
+        self.assertTrue(self.game.undo_last_move())
+        self.assertEqual(self.game.check_path_to_end(p0), (True, 7))
+
+    def test_wall_touches_after_undo(self):
+        p0, p1 = self.game.players
+        touches = list(self.game.wall_touches)
+        self.assertTrue(self.game.perform_action(p0, "wall", ((4.5,4.5), "horizontal")))
+        self.assertTrue(self.game.perform_action(p1, "wall", ((6.5,4.5), "horizontal")))
+        self.assertEqual(self.game.wall_touches[5 + 10 * 4], 2)
+        self.assertTrue(self.game.undo_last_move())
+        self.assertTrue(self.game.undo_last_move())
+        self.assertEqual(self.game.wall_touches, touches)
+
+    def test_wall_closing_loop_is_checked(self):
+        p0, p1 = self.game.players
+        p0.pos = (1, 1)
+        self.assertTrue(self.game.perform_action(p0, "wall", ((1.5,1.5), "horizontal")))
+        self.assertTrue(self.game.is_legal_wall(p1, (2.5,2.5), "vertical", undo_successful_wall = True))
+        self.assertFalse(self.game.perform_action(p1, "wall", ((2.5,1.5), "vertical")))
+        self.assertTrue(self.game.perform_action(p1, "wall", ((3.5,7.5), "vertical")))
+
+    def test_zobrist_incremental(self):
+        p0, p1 = self.game.players
+        start = self.game.zobrist
+        self.assertTrue(self.game.perform_action(p0, "wall", ((4.5,4.5), "horizontal")))
+        self.assertTrue(self.game.perform_action(p1, "move", (0, -1)))
+        self.assertTrue(self.game.perform_action(p0, "move", (1, 0)))
+        self.assertEqual(self.game.zobrist, self.game.compute_zobrist())
+        for _ in range(3):
+            self.assertTrue(self.game.undo_last_move())
+        self.assertEqual(self.game.zobrist, start)
+
+    def test_zobrist_transposition(self):
+        p0, p1 = self.game.players
+        other = Game()
+        q0, q1 = other.players
+        self.game.perform_action(p0, "move", (0, 1))
+        self.game.perform_action(p1, "move", (0, -1))
+        self.game.perform_action(p0, "move", (1, 0))
+        other.perform_action(q0, "move", (1, 0))
+        other.perform_action(q1, "move", (0, -1))
+        other.perform_action(q0, "move", (0, 1))
+        self.assertEqual(self.game.zobrist, other.zobrist)
+        self.game.perform_action(p1, "wall", ((4.5,4.5), "horizontal"))
+        other.perform_action(q1, "move", (0, -1))
+        self.assertNotEqual(self.game.zobrist, other.zobrist)
+
+    def test_legal_actions_initial(self):
+        actions = list(self.game.legal_actions())
+        self.assertEqual([a for a in actions if a[0] == "move"], [("move", (-1, 0)), ("move", (1, 0)), ("move", (0, 1))])
+        self.assertEqual(len(actions), 3 + 128)
+
+    def test_legal_actions_match_perform_action(self):
+        p0, p1 = self.game.players
+        p0.pos = (5, 4)
+        p1.pos = (5, 5)
+        self.game.perform_action(p0, "wall", ((5.5,5.5), "horizontal"))
+        self.game.perform_action(p1, "wall", ((1.5,3.5), "vertical"))
+        actions = set(self.game.legal_actions())
+        for action_type, action in [("move", d) for d in [(0, 1), (0, 2), (1, 1), (-1, 1), (1, 0)]] + [("wall", ((1.5,4.5), "vertical")), ("wall", ((4.5,4.5), "vertical"))]:
+            legal = self.game.perform_action(p0, action_type, action)
+            self.assertEqual(legal, (action_type, action) in actions)
+            if legal:
+                self.game.undo_last_move()
+
+    def test_mobility(self):
+        p0, p1 = self.game.players
+        self.assertEqual(self.game.mobility(p0), 3)
+        self.assertEqual(self.game.mobility(p0, 1 << 0), 5) # both walls fit in the corner slot
+        self.game.perform_action(p0, "wall", ((2.5,1.5), "horizontal"))
+        self.assertEqual(self.game.mobility(p1, 1 << 0 | 1 << 1), 4) # slot 1 is taken, only the corner vertical wall fits
+
+    def test_distance_fields_match_check_path_to_end(self):
+        try:
+            from distance_fields import path_lengths, child_positions
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+        p0, p1 = self.game.players
+        self.game.perform_action(p0, "wall", ((4.5,1.5), "horizontal"))
+        self.game.perform_action(p1, "wall", ((5.5,8.5), "vertical"))
+        actions = list(self.game.legal_actions())
+        positions = child_positions(self.game, p0, actions)
+        lengths = path_lengths([mask for mask, _ in positions], [squares for _, squares in positions]).tolist()
+        for action, path_lens in zip(actions, lengths):
+            self.game.perform_action(p0, action[0], action[1])
+            self.assertEqual(path_lens, [self.game.check_path_to_end(p0)[1], self.game.check_path_to_end(p1)[1]])
+            self.game.undo_last_move()
+
+    def test_game_state_round_trip(self):
+        p0, p1 = self.game.players
+        self.game.perform_action(p0, "wall", ((4.5,4.5), "horizontal"))
+        self.game.perform_action(p1, "move", (0, -1))
+        self.game.perform_action(p0, "wall", ((2.5,6.5), "vertical"))
+        state = GameState.from_game(self.game)
+        game = state.to_game()
+        self.assertEqual(GameState.from_game(game), state)
+        self.assertEqual(game.zobrist, self.game.zobrist)
+        self.assertEqual(game.blocked, self.game.blocked)
+        self.assertEqual(list(game.legal_actions()), list(self.game.legal_actions()))
+        self.assertEqual(pickle.loads(pickle.dumps(state)), state)
+        self.assertNotEqual(GameState.from_game(Game()), state)
+        with self.assertRaises(AttributeError):
+            state.walls = 0
+
+    def test_action_codes(self):
+        self.assertEqual(NUM_ACTIONS, 140)
+        self.assertEqual(decode_action(2), ("move", (0, 1)))
+        self.assertEqual(encode_action("wall", ((1.5,1.5), "horizontal")), 13)
+        codes = [encode_action(*action) for action in self.game.legal_actions()]
+        self.assertEqual(len(set(codes)), len(codes))
+        for code in range(NUM_ACTIONS):
+            self.assertEqual(encode_action(*decode_action(code)), code)
+
+    def test_play_codes(self):
+        # Two walls conflict exactly when they share a slot or an edge
+        for a in range(12, NUM_ACTIONS):
+            for b in range(12, NUM_ACTIONS):
+                overlap = (a - 12) // 2 == (b - 12) // 2 or WALL_CODE_EDGES[a] & WALL_CODE_EDGES[b]
+                self.assertEqual(bool(WALL_CONFLICTS[a] >> (b - 12) & 1), bool(overlap))
+        other = Game()
+        for code in [encode_action("wall", ((4.5,2.5), "horizontal")), 3, 1, encode_action("wall", ((6.5,2.5), "horizontal"))]:
+            self.assertEqual(list(self.game.legal_codes()), [encode_action(*action) for action in self.game.legal_actions()])
+            action_type, action = decode_action(code)
+            self.assertEqual(self.game.play(code), other.perform_action(other.players[other.cur_player], action_type, action))
+            self.assertEqual(self.game.zobrist, other.zobrist)
+        self.assertEqual(self.game.actions, other.actions)
+        self.assertEqual(len(self.game.codes), 4)
+        self.assertFalse(self.game.play(encode_action("wall", ((4.5,2.5), "vertical")))) # crosses a wall
+        self.assertFalse(self.game.play(NUM_ACTIONS))
+        while self.game.undo():
+            pass
+        self.assertEqual((self.game.zobrist, self.game.wall_codes, self.game.codes), (Game().zobrist, 0, []))
+
+    def test_endgame_race(self):
+        from endgame import solve, pawn_moves
+        p0, p1 = self.game.players
+        self.assertIsNone(solve(self.game)) # walls left
+        p0.remaining_walls = p1.remaining_walls = 0
+        p0.pos, p1.pos = (5, 8), (5, 2)
+        self.assertEqual(solve(self.game), (0, 1, ("move", (0, 1))))
+        p0.pos, p1.pos = (5, 8), (5, 9)
+        self.assertEqual(sorted(d for d, _ in pawn_moves(4 + 9 * 7, 4 + 9 * 8, self.game.blocked)), sorted(self.game.legal_pawn_moves(p0)))
+        self.assertIsNone(solve(self.game)[0]) # player 1 can shadow player 0 along the top row forever
+        p0.pos, p1.pos = (5, 5), (1, 5)
+        winner, plies, move = solve(self.game)
+        self.assertEqual((winner, plies, move), (0, 7, ("move", (0, 1))))
+        while self.game.winner is None:
+            self.assertEqual(solve(self.game)[:2], (winner, plies))
+            self.assertTrue(self.game.perform_action(self.game.players[self.game.cur_player], *solve(self.game)[2]))
+            plies -= 1
+        self.assertEqual((self.game.winner, plies), (0, 0))
+
+    def test_notation(self):
+        from records import action_to_notation, notation_to_action
+        self.assertEqual(action_to_notation(self.game, "move", (0, 1)), "e2")
+        self.assertEqual(action_to_notation(self.game, "wall", ((4.5,8.5), "horizontal")), "d8h")
+        self.assertEqual(notation_to_action(self.game, "d8h"), ("wall", ((4.5,8.5), "horizontal")))
+        self.assertEqual(notation_to_action(self.game, "E2"), ("move", (0, 1)))
+        self.assertRaises(ValueError, notation_to_action, self.game, "i9v")
+        self.assertRaises(ValueError, notation_to_action, self.game, "e0")
+
+    def test_record_file_round_trip(self):
+        from records import RecordWriter, read_records, replay, to_notation
+        p0, p1 = self.game.players
+        self.game.perform_action(p0, "move", (0, 1))
+        self.game.perform_action(p1, "wall", ((4.5,2.5), "horizontal"))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            with RecordWriter(path) as writer:
+                writer.write_game(self.game)
+            with RecordWriter(path) as writer:
+                writer.write([2], 0)
+            with open(path, "ab") as f:
+                f.write(b"\x00\x05\x00\x02") # cut off record
+            records = list(read_records(path))
+        self.assertEqual([winner for winner, _ in records], [None, 0])
+        self.assertEqual(to_notation(records[0][1]), ["e2", "d2h"])
+        self.assertEqual(replay(records[0][1]).zobrist, self.game.zobrist)
+
+    def test_perft_matches_independent_count(self):
+        from benchmark import CORPUS, load_position, perft, perft_by_trial
+        # Pawns face to face with walls behind both, so that the diagonal jumps come up
+        facing = [("move", (0, 1)), ("move", (0, -1))] * 3 + [("move", (0, 1)), ("wall", ((5.5, 4.5), "horizontal")),
+                                                              ("wall", ((4.5, 6.5), "horizontal"))]
+        for actions in CORPUS[3:] + [facing]:
+            game = load_position(actions)
+            self.assertEqual(perft(game, 2), perft_by_trial(game, 2))
+            self.assertEqual(game.actions, actions)
+
+    def test_record_writer_drops_cut_off_record(self):
+        from records import RecordWriter, read_records, MAGIC
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            with RecordWriter(path) as writer:
+                writer.write([0, 2], 1)
+                writer.write([4, 6, 8], 0)
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 2) # cut the second game off mid-record
+            with RecordWriter(path) as writer:
+                writer.write([1], None)
+            records = [(winner, list(codes)) for winner, codes in read_records(path)]
+            self.assertEqual(records, [(1, [0, 2]), (None, [1])])
+
+            with open(path, "wb") as f:
+                f.write(MAGIC[:3]) # cut off inside the magic
+            with RecordWriter(path) as writer:
+                writer.write([3], 0)
+            self.assertEqual([(winner, list(codes)) for winner, codes in read_records(path)], [(0, [3])])
+
+            with open(path, "wb") as f:
+                f.write(b"not a record file")
+            self.assertRaises(ValueError, RecordWriter, path)
+
+
+def random_game(plies, seed):
+    # Reproducible position reached by random legal actions, half of them pawn moves
+    rng = random.Random(seed)
+    game = Game()
+    for _ in range(plies):
+        codes = list(game.legal_codes())
+        moves = [code for code in codes if code < 12]
+        game.play(rng.choice(moves if rng.random() < 0.5 else codes))
+    return game
+
+def plain_minimax(bot, game, depth, maximizing_score):
+    # Minimax without pruning or tables, returning (score, first best move in generation order)
+    if depth == 0 or game.winner is not None:
+        return bot.heuristic(game, bot.bot, bot.player), None
+    best_score, best_move = None, None
+    for code in list(game.legal_codes()):
+        game.play(code)
+        score, _ = plain_minimax(bot, game, depth - 1, not maximizing_score)
+        game.undo()
+        if best_score is None or (score > best_score if maximizing_score else score < best_score):
+            best_score, best_move = score, code
+    return best_score, best_move
+
+class TestSearch(unittest.TestCase):
+
+    def test_transposition_table(self):
+        from transposition_table import TranspositionTable, EXACT, LOWER
+        tt = TranspositionTable(8)
+        tt.new_search()
+        self.assertIsNone(tt.probe(3))
+        tt.store(3, 2, EXACT, 1.5, 7)
+        self.assertEqual(tt.probe(3)[:5], (3, 2, EXACT, 1.5, 7))
+        tt.store(3, 1, LOWER, 0.5, 8) # shallower result of the same search is dropped
+        self.assertEqual(tt.probe(3)[1], 2)
+        self.assertIsNone(tt.probe(11)) # same slot, other key
+        self.assertEqual(tt.collisions, 1)
+        tt.new_search()
+        self.assertEqual(tt.probe(3)[1], 2) # kept between searches
+        tt.store(11, 1, LOWER, 0.5, 8) # but replaced first
+        self.assertIsNone(tt.probe(3))
+        self.assertEqual(tt.probe(11)[:5], (11, 1, LOWER, 0.5, 8))
+        self.assertEqual(tt.replacements, 1)
+
+    def test_pruned_search_matches_minimax(self):
+        from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+        from v1 import ACTIONS
+        variants = [{}, {"use_killers": False, "use_history": False}, {"use_pvs": True}, {"aspiration_window": 0.25}]
+        positions = [(random_game(6, seed), (1, 2)) for seed in range(3)]
+        for seed in range(3):
+            # Without walls left the branching factor is small enough to search deep,
+            # where transpositions and cutoffs from the table come into play
+            game = random_game(8, seed)
+            for player in game.players:
+                player.remaining_walls = 0
+            game.zobrist = game.compute_zobrist()
+            positions.append((game, (3, 4, 5)))
+        for seed, (game, depths) in enumerate(positions):
+            reference = nMiniMaxPruningBot(game, game.cur_player, 2, collect_stats = False)
+            for depth in depths:
+                score, move = plain_minimax(reference, game, depth, True)
+                for options in variants:
+                    bot = nMiniMaxPruningBot(game, game.cur_player, depth, **options)
+                    self.assertEqual(bot.choose_move(max_depth = depth), (score, ACTIONS[move]), (seed, depth, options))
+                    # Searching again with the table from the first search gives the same result
+                    self.assertEqual(bot.choose_move(max_depth = depth), (score, ACTIONS[move]), (seed, depth, options))
+
+    def test_table_keeps_move_counts_apart(self):
+        # The same position after two extra moves back and forth scores differently, because
+        # the heuristic depends on the move count, so a shared table must not mix them up
+        from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+        from v1 import DIRECTIONS, DIRECTION_ORDER
+        game = random_game(6, 0)
+        later = random_game(6, 0)
+        for _ in range(2):
+            for code in later.legal_codes():
+                if code < 4 and later.play(code):
+                    break
+        for code in list(later.codes[-2:]):
+            dx, dy = DIRECTIONS[code]
+            self.assertTrue(later.play(DIRECTION_ORDER[-dx, -dy]))
+        self.assertEqual(later.zobrist, game.zobrist)
+        bot = nMiniMaxPruningBot(game, game.cur_player, 2)
+        bot.choose_move(max_depth = 2)
+        shared = nMiniMaxPruningBot(later, later.cur_player, 2)
+        shared.tt = bot.tt
+        self.assertEqual(shared.choose_move(max_depth = 2), nMiniMaxPruningBot(later, later.cur_player, 2).choose_move(max_depth = 2))
+
+    def test_opening_book(self):
+        from opening_book import OpeningBook, MIRROR_ACTION, build_book, write_book, canonical_key
+        def mirror(action_type, action):
+            # Left to right mirror image of an action, worked out from the coordinates
+            if action_type == "move":
+                return "move", (-action[0], action[1])
+            (x, y), orientation = action
+            return "wall", ((10 - x, y), orientation)
+
+        def after(action):
+            game = Game()
+            self.assertTrue(game.perform_action(game.players[0], *action))
+            return game
+
+        entries = build_book(plies = 3, depth = 1, width = 2)
+        # The searched moves all go straight ahead, so store a sideways move and a wall by hand too
+        extra = {("wall", ((7.5, 6.5), "horizontal")): ("wall", ((2.5, 3.5), "vertical")),
+                 ("wall", ((2.5, 5.5), "vertical")): ("move", (1, 0))}
+        for action, move in extra.items():
+            key, mirrored = canonical_key(after(action))
+            entries[key] = MIRROR_ACTION[encode_action(*move)] if mirrored else encode_action(*move)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            write_book(path, entries)
+            with OpeningBook(path) as book:
+                self.assertEqual(len(book), len(entries))
+                for action, move in extra.items():
+                    self.assertEqual(book.lookup(after(action)), move)
+                # Stored positions one action in that are not their own mirror image
+                first_moves = [action for action in Game().legal_actions()
+                               if action != mirror(*action) and book.lookup(after(action)) is not None]
+                self.assertGreater(len(first_moves), len(extra))
+                for action in first_moves:
+                    game, other = after(action), after(mirror(*action))
+                    self.assertNotEqual(game.zobrist, other.zobrist)
+                    move = book.lookup(game)
+                    self.assertEqual(book.lookup(other), mirror(*move))
+                    for position, book_move in ((game, move), (other, mirror(*move))):
+                        self.assertTrue(position.perform_action(position.players[position.cur_player], *book_move))
+                self.assertIsNone(book.lookup(random_game(8, 1)))
+
+    def test_parallel_worker_tables_per_side(self):
+        import parallel_search
+        first = random_game(6, 0)
+        second = random_game(7, 0)
+        self.assertNotEqual(first.cur_player, second.cur_player)
+        tasks = [(list(game.codes), game.cur_player, {}, 3, -1e20, list(game.legal_codes())[:12]) for game in (first, second)]
+        parallel_search.init_worker(1 << 12)
+        fresh = []
+        for task in tasks:
+            fresh.append(parallel_search.search_root_moves(task)[0])
+            parallel_search.init_worker(1 << 12)
+        # One worker searching for both sides in turn gets the same scores as fresh workers
+        for task, expected in zip(tasks + tasks, fresh + fresh):
+            self.assertEqual(parallel_search.search_root_moves(task)[0], expected)
+
+    def test_analysis_independent_of_order(self):
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+        import analyze
+        codes = list(random_game(12, 4).codes)
+        tasks = [(0, ply, codes, 3, None) for ply in (2, 4)]
+        fresh = []
+        for task in tasks:
+            analyze.init_worker(1 << 14)
+            fresh.append(analyze.analyze_position(task))
+        # Analysing ply 4 first leaves deeper entries for positions the search from ply 2 reaches
+        analyze.init_worker(1 << 14)
+        for task, expected in reversed(list(zip(tasks, fresh))):
+            self.assertEqual(analyze.analyze_position(task), expected)
+
+    def test_server_bot_limits(self):
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+        import server
+        game_server = server.GameServer(workers = 1)
+        for bot in ("nMiniMaxBot:n=9", "nMiniMaxPruningBot:n=2,tt_size=1000000000", "MCTSBot:book='/etc/passwd'", ["RandomBot"]):
+            self.assertIsInstance(game_server.new_session({"bot": bot}), str)
+        for initial in (1e9, float("nan"), 0):
+            self.assertIsInstance(game_server.new_session({"bot": "RandomBot", "initial": initial}), str)
+        session = game_server.new_session({"bot": "nMiniMaxPruningBot:n=3", "player": 1})
+        self.assertEqual(session.bot_spec, server.SERVER_BOTS["nMiniMaxPruningBot:n=3"])
+        # The worker stops at the time limit it is handed, whatever the bot's depth
+        start = time.perf_counter()
+        code = server.bot_move((session.bot_spec, [], 0, 0.2))
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn(code, list(Game().legal_codes()))
+
+    def test_search_abort(self):
+        from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+        game = random_game(6, 1)
+        codes, zobrist = list(game.codes), game.zobrist
+        bot = nMiniMaxPruningBot(game, game.cur_player, 3)
+        result = bot.choose_move(max_nodes = 500)
+        self.assertEqual((game.codes, game.zobrist), (codes, zobrist)) # aborted search left the game as it was
+        self.assertGreaterEqual(bot.completed_depth, 1)
+        self.assertEqual(result, nMiniMaxPruningBot(game, game.cur_player, 3).choose_move(max_depth = bot.completed_depth))
+        bot.stop = True
+        self.assertIsNone(bot.choose_move(max_depth = 2)) # stopped before depth 1
+        self.assertEqual((game.codes, game.zobrist), (codes, zobrist))
 
 
 # Create a test suite combining all the test cases
 def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTest(unittest.makeSuite(TestQuoridorGame))
+    test_suite.addTest(unittest.makeSuite(TestSearch))
     return test_suite
 
 # Run the tests
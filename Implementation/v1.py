@@ -1,5 +1,165 @@
-import networkx as nx
 import heapq
+import random
+
+# BOARD TABLES #
+# Squares are indexed as (x - 1) + 9 * (y - 1), so (1,1) is 0 and (9,9) is 80.
+# Every edge between two adjacent squares owns one bit of Game.blocked: the edge
+# from a square to the square above it uses bit `sq`, and the edge from a square
+# to the square on its right uses bit `81 + sq`. Wall slots are indexed as
+# (x - 1) + 8 * (y - 1) for the wall centered at (x + 0.5, y + 0.5).
+
+SQUARES = tuple((x, y) for y in range(1, 10) for x in range(1, 10))
+SQUARE_INDEX = {pos: sq for sq, pos in enumerate(SQUARES)}
+
+EDGE_MASK = {}
+for _sq, (_x, _y) in enumerate(SQUARES):
+    if _y < 9:
+        EDGE_MASK[(_x, _y), (_x, _y + 1)] = EDGE_MASK[(_x, _y + 1), (_x, _y)] = 1 << _sq
+    if _x < 9:
+        EDGE_MASK[(_x, _y), (_x + 1, _y)] = EDGE_MASK[(_x + 1, _y), (_x, _y)] = 1 << (81 + _sq)
+
+# NEIGHBORS[sq] lists (neighbor square, edge bit) for every square next to sq
+NEIGHBORS = tuple(
+    tuple((SQUARE_INDEX[(x + dx, y + dy)], EDGE_MASK[(x, y), (x + dx, y + dy)])
+          for dx, dy in ((-1, 0), (1, 0), (0, 1), (0, -1))
+          if (x + dx, y + dy) in SQUARE_INDEX)
+    for x, y in SQUARES
+)
+
+# Pawn directions in the order actions are generated in
+DIRECTIONS = ((-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2))
+DIRECTION_ORDER = {dir: i for i, dir in enumerate(DIRECTIONS)}
+
+# STEPS[sq] lists (direction, destination, edge bit) for the single steps from sq
+STEPS = tuple(
+    tuple(((dx, dy), SQUARE_INDEX[(x + dx, y + dy)], EDGE_MASK[(x, y), (x + dx, y + dy)])
+          for dx, dy in ((-1, 0), (1, 0), (0, 1), (0, -1))
+          if (x + dx, y + dy) in SQUARE_INDEX)
+    for x, y in SQUARES
+)
+
+# JUMPS[(sq, opponent)] for neighboring squares holds the straight jump over the opponent
+# as (direction, destination, edge bit), or None if the opponent is against the border,
+# followed by the diagonal jumps used when a wall stands behind the opponent
+JUMPS = {}
+for (_x, _y), _sq in SQUARE_INDEX.items():
+    for (_dx, _dy), _opp, _ in STEPS[_sq]:
+        _ox, _oy = _x + _dx, _y + _dy
+        _behind = (_ox + _dx, _oy + _dy)
+        _straight = None
+        if _behind in SQUARE_INDEX:
+            _straight = ((2 * _dx, 2 * _dy), SQUARE_INDEX[_behind], EDGE_MASK[(_ox, _oy), _behind])
+        _diagonals = tuple(((_dx + _sx, _dy + _sy), SQUARE_INDEX[(_ox + _sx, _oy + _sy)], EDGE_MASK[(_ox, _oy), (_ox + _sx, _oy + _sy)])
+                           for _sx, _sy in ((_dy, _dx), (-_dy, -_dx))
+                           if (_ox + _sx, _oy + _sy) in SQUARE_INDEX)
+        JUMPS[_sq, _opp] = (_straight, _diagonals)
+
+WALL_SLOTS = {(x + 0.5, y + 0.5): (x - 1) + 8 * (y - 1) for y in range(1, 9) for x in range(1, 9)}
+WALL_CENTERS = tuple(sorted(WALL_SLOTS, key = WALL_SLOTS.get)) # wall position of every slot
+
+# WALL_EDGES[(slot, orientation)] is the mask of the two edges the wall blocks
+WALL_EDGES = {}
+for (_cx, _cy), _slot in WALL_SLOTS.items():
+    _x, _y = int(_cx - 0.5), int(_cy - 0.5)
+    WALL_EDGES[_slot, "horizontal"] = EDGE_MASK[(_x, _y), (_x, _y + 1)] | EDGE_MASK[(_x + 1, _y), (_x + 1, _y + 1)]
+    WALL_EDGES[_slot, "vertical"] = EDGE_MASK[(_x, _y), (_x + 1, _y)] | EDGE_MASK[(_x, _y + 1), (_x + 1, _y + 1)]
+
+# Wall actions in the order they are generated in, as ((position, orientation), slot)
+WALL_ACTIONS = tuple(((pos, orientation), WALL_SLOTS[pos])
+                     for pos in [(i+1.5, j+1.5) for i in range(8) for j in range(8)]
+                     for orientation in ("vertical", "horizontal"))
+
+# Actions are coded as integers 0..139 for compact storage: the pawn directions take
+# 0..11 in the order of DIRECTIONS, and a wall takes 12 + 2 * slot + orientation with
+# orientation 0 for vertical and 1 for horizontal
+ORIENTATIONS = ("vertical", "horizontal")
+NUM_ACTIONS = len(DIRECTIONS) + 2 * len(WALL_SLOTS)
+
+def encode_action(action_type, action):
+    '''
+    Returns the integer code of an action.
+
+    action_type:    "move" or "wall" (str)
+    action:         Direction or (position, orientation) as
+                    passed to Game.perform_action
+    '''
+    if action_type == "move":
+        return DIRECTION_ORDER[action]
+    pos, orientation = action
+    return len(DIRECTIONS) + 2 * WALL_SLOTS[pos] + ORIENTATIONS.index(orientation)
+
+def decode_action(code):
+    '''
+    Returns the action with an integer code as (action_type, action).
+
+    code:   Action code from encode_action (int)
+    '''
+    if code < len(DIRECTIONS):
+        return "move", DIRECTIONS[code]
+    slot, orientation = divmod(code - len(DIRECTIONS), 2)
+    return "wall", (WALL_CENTERS[slot], ORIENTATIONS[orientation])
+
+# Wall endpoints and midpoints lie on the grid corners (i + 0.5, j + 0.5) for i, j in
+# 0..9, indexed as i + 10 * j. WALL_POINTS[(slot, orientation)] lists the three corners
+# a wall touches, and BORDER_POINTS are the corners on the edge of the board.
+WALL_POINTS = {}
+for (_cx, _cy), _slot in WALL_SLOTS.items():
+    _center = int(_cx - 0.5) + 10 * int(_cy - 0.5)
+    WALL_POINTS[_slot, "horizontal"] = (_center - 1, _center, _center + 1)
+    WALL_POINTS[_slot, "vertical"] = (_center - 10, _center, _center + 10)
+BORDER_POINTS = tuple(i + 10 * j for j in range(10) for i in range(10) if i in (0, 9) or j in (0, 9))
+
+# ZOBRIST KEYS #
+# Random 64-bit keys for every pawn square, wall placement, remaining wall count and
+# the side to move. The seed is fixed so that keys are the same between runs.
+_zobrist_rng = random.Random(0x5155_4f52)
+ZOBRIST_PAWN = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in SQUARES) for _ in range(2))
+ZOBRIST_WALL = {key: _zobrist_rng.getrandbits(64) for key in sorted(WALL_EDGES)}
+ZOBRIST_WALLS_LEFT = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(11)) for _ in range(2))
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+# ACTION TABLES #
+# Everything Game.play needs to know about an action code, so that the hot path never
+# builds or hashes action tuples. ACTIONS[code] is the (action_type, action) of a code and
+# ACTION_CODES maps it back. MOVE_DESTINATIONS[sq][code] is the square a pawn direction
+# leads to from sq, or None off the board. The WALL_CODE_* tables give the slot, blocked
+# edges, touched corners and Zobrist key of every wall code (None for pawn codes), and
+# WALL_CONFLICTS[code] is the mask of the placed walls that rule the wall out: the other
+# wall in its slot and the walls of its orientation in the slots next to it, which would
+# overlap it. Placed walls are kept in Game.wall_codes, using bit code - NUM_DIRECTIONS.
+NUM_DIRECTIONS = len(DIRECTIONS)
+ACTIONS = tuple(decode_action(code) for code in range(NUM_ACTIONS))
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+MOVE_DESTINATIONS = tuple(tuple(SQUARE_INDEX.get((x + dx, y + dy)) for dx, dy in DIRECTIONS) for x, y in SQUARES)
+
+WALL_CODE_SLOT = [None] * NUM_ACTIONS
+WALL_CODE_EDGES = [None] * NUM_ACTIONS
+WALL_CODE_POINTS = [None] * NUM_ACTIONS
+WALL_CODE_ZOBRIST = [None] * NUM_ACTIONS
+WALL_CONFLICTS = [None] * NUM_ACTIONS
+for _code in range(NUM_DIRECTIONS, NUM_ACTIONS):
+    _slot, _orientation = divmod(_code - NUM_DIRECTIONS, 2)
+    _key = (_slot, ORIENTATIONS[_orientation])
+    WALL_CODE_SLOT[_code] = _slot
+    WALL_CODE_EDGES[_code] = WALL_EDGES[_key]
+    WALL_CODE_POINTS[_code] = WALL_POINTS[_key]
+    WALL_CODE_ZOBRIST[_code] = ZOBRIST_WALL[_key]
+    _conflicts = 0b11 << 2 * _slot
+    _x, _y = _slot % 8, _slot // 8
+    if ORIENTATIONS[_orientation] == "horizontal":
+        _neighbors = [_slot + dx for dx in (-1, 1) if 0 <= _x + dx < 8]
+    else:
+        _neighbors = [_slot + 8 * dy for dy in (-1, 1) if 0 <= _y + dy < 8]
+    for _neighbor in _neighbors:
+        _conflicts |= 1 << (2 * _neighbor + _orientation)
+    WALL_CONFLICTS[_code] = _conflicts
+WALL_CODE_SLOT, WALL_CODE_EDGES, WALL_CODE_POINTS, WALL_CODE_ZOBRIST, WALL_CONFLICTS = map(
+    tuple, (WALL_CODE_SLOT, WALL_CODE_EDGES, WALL_CODE_POINTS, WALL_CODE_ZOBRIST, WALL_CONFLICTS))
+
+# Wall codes in the order of WALL_ACTIONS, which is the order walls are generated in
+WALL_CODE_ORDER = tuple(ACTION_CODES["wall", action] for action, _ in WALL_ACTIONS)
+
 
 class Player():
     def __init__(self, player_id, pos, remaining_walls):
@@ -20,17 +180,17 @@ class Game():
         x-axis is horizontal and the y-axis is vertical, and 
         the bottom left corner is (1,1). The players are 
         initialized using instances of the Player class. The 
-        walls are stored as a set of tuples for wall positions.
+        walls are stored as a set of tuples for wall positions,
+        and the edges they block are packed into the bits of
+        self.blocked (see the board tables above).
         '''
         # initialize board
-        self.graph = nx.Graph()
-        for i in range(1,10):
-            for j in range(1,10):
-                self.graph.add_node((i,j))
-                if i > 1:
-                    self.graph.add_edge((i,j),(i-1,j))
-                if j > 1:
-                    self.graph.add_edge((i,j),(i,j-1))
+        self.blocked = 0
+        self.wall_slots = 0
+        self.wall_codes = 0
+        self.wall_touches = [0] * 100
+        for point in BORDER_POINTS:
+            self.wall_touches[point] = 1
 
         # initialize players and walls
         self.players = [Player(0, (5,1), 10), Player(1, (5,9), 10)]
@@ -38,6 +198,12 @@ class Game():
         self.cur_player = 0
         self.winner = None
         self.actions = []
+        self.codes = []
+        self.zobrist = self.compute_zobrist()
+
+        # cached shortest paths, see check_path_to_end
+        self.path_cache = [None, None]
+        self.path_cache_history = []
         
         
 
@@ -45,7 +211,8 @@ class Game():
         '''
         Performs an action by updating the state of the game if the
         move is legal. Otherwise, returns False and does not perform
-        any move.
+        any move. The action is looked up in ACTION_CODES and played
+        through play.
 
         player:         Current player (Player)
         action_type:    Specifies between wall placements or player movement actions (str)
@@ -53,61 +220,98 @@ class Game():
                         orientation of the wall as ((float, float), str). For player movements, provide
                         the direction as (int, int).
         '''
-        if player.player_id != self.cur_player or self.winner != None:
+        if player.player_id != self.cur_player:
             #print("Player not allowed to move")
             return False
-        if action_type == "move":
-            dir = action
-            if self.is_legal_move(player, dir):
-                player.pos = (player.pos[0] + dir[0], player.pos[1] + dir[1])
-                #print("Moved player {p} to position ({x},{y})".format(p = player.player_id, x = player.pos[0], y = player.pos[1]))
-            else:
-                #print("Invalid move for player {p}".format(p = player.player_id))
+        code = ACTION_CODES.get((action_type, action))
+        if code is None:
+            return False
+        return self.play(code)
+
+
+
+    def play(self, code):
+        '''
+        Performs the action with the given code for the player whose
+        turn it is if it is legal, and returns whether it was. Both
+        the code and its tuple are added to the history, in
+        self.codes and self.actions.
+
+        code:   Action code, see encode_action (int)
+        '''
+        if self.winner != None or not 0 <= code < NUM_ACTIONS:
+            return False
+        player = self.players[self.cur_player]
+        path_cache = tuple(self.path_cache)
+        if code < NUM_DIRECTIONS:
+            if code not in self.legal_pawn_codes(player):
                 return False
-        
-        elif action_type == "wall":
-            pos, orientation = action
-            if self.is_legal_wall(player, pos, orientation):
-                self.walls.add(action)
-                player.remaining_walls -= 1
-                #print("{o} wall at ({p0},{p1}) placed successfully.".format(o=orientation, p0=pos[0], p1=pos[1]))
-            else:
-                #print("Invalid wall placement")
+            sq = SQUARE_INDEX[player.pos]
+            dest = MOVE_DESTINATIONS[sq][code]
+            pawn_keys = ZOBRIST_PAWN[player.player_id]
+            self.zobrist ^= pawn_keys[sq] ^ pawn_keys[dest]
+            player.pos = SQUARES[dest]
+        else:
+            if not self.is_legal_wall_code(player, code):
                 return False
-            
+            self.walls.add(ACTIONS[code][1])
+            self.wall_codes |= 1 << (code - NUM_DIRECTIONS)
+            self.wall_slots |= 1 << WALL_CODE_SLOT[code]
+            for point in WALL_CODE_POINTS[code]:
+                self.wall_touches[point] += 1
+            walls_left_keys = ZOBRIST_WALLS_LEFT[player.player_id]
+            self.zobrist ^= WALL_CODE_ZOBRIST[code] ^ walls_left_keys[player.remaining_walls]
+            player.remaining_walls -= 1
+            self.zobrist ^= walls_left_keys[player.remaining_walls]
+
         self.cur_player = 1 - self.cur_player
+        self.zobrist ^= ZOBRIST_SIDE
         self.check_win_condition()
-        self.actions.append((action_type, action))
+        self.codes.append(code)
+        self.actions.append(ACTIONS[code])
+        self.path_cache_history.append(path_cache)
         return True
-    
+
 
 
     def undo_last_move(self):
-        if self.actions == []:
+        # Same as undo, kept for the tuple based API
+        return self.undo()
+
+
+
+    def undo(self):
+        '''
+        Takes back the last action, returning False if there is
+        none.
+        '''
+        if not self.codes:
             #print("No action to undo")
             return False
-        if self.winner != None:
-            self.winner = None
-        action_type, last_action = self.actions.pop(-1)
+        self.winner = None
+        code = self.codes.pop()
+        self.actions.pop()
+        self.path_cache = list(self.path_cache_history.pop())
         self.cur_player = 1 - self.cur_player
+        self.zobrist ^= ZOBRIST_SIDE
         player = self.players[self.cur_player]
-        if action_type == "move":
-            dir = last_action
+        if code < NUM_DIRECTIONS:
+            dir = DIRECTIONS[code]
+            pawn_keys = ZOBRIST_PAWN[player.player_id]
+            self.zobrist ^= pawn_keys[SQUARE_INDEX[player.pos]]
             player.pos = (player.pos[0] - dir[0], player.pos[1] - dir[1])
-        elif action_type == "wall":
-            pos, orientation = last_action
-            surrounding_nodes = [(pos[0] - 0.5, pos[1] - 0.5), (pos[0] + 0.5, pos[1] - 0.5), (pos[0] + 0.5, pos[1] + 0.5), (pos[0] - 0.5, pos[1] + 0.5)]
-            if orientation == "horizontal":
-                connections = ((surrounding_nodes[0], surrounding_nodes[3]), (surrounding_nodes[1], surrounding_nodes[2]))
-            elif orientation == "vertical":
-                connections = ((surrounding_nodes[0], surrounding_nodes[1]), (surrounding_nodes[2], surrounding_nodes[3]))
-            self.graph.add_edge(connections[0][0], connections[0][1])
-            self.graph.add_edge(connections[1][0], connections[1][1])
-            self.walls.remove((pos, orientation))
-            player.remaining_walls += 1
+            self.zobrist ^= pawn_keys[SQUARE_INDEX[player.pos]]
         else:
-            #print("Illegal action was previously taken")
-            return False
+            self.blocked &= ~WALL_CODE_EDGES[code]
+            self.wall_codes &= ~(1 << (code - NUM_DIRECTIONS))
+            self.wall_slots &= ~(1 << WALL_CODE_SLOT[code])
+            for point in WALL_CODE_POINTS[code]:
+                self.wall_touches[point] -= 1
+            self.walls.remove(ACTIONS[code][1])
+            walls_left_keys = ZOBRIST_WALLS_LEFT[player.player_id]
+            self.zobrist ^= WALL_CODE_ZOBRIST[code] ^ walls_left_keys[player.remaining_walls]
+            player.remaining_walls += 1
+            self.zobrist ^= walls_left_keys[player.remaining_walls]
         return True
 
 
@@ -117,18 +321,19 @@ class Game():
         Checks if a player's proposed move is in accordance with the 
         rules of Quoridor. Specifically makes sure that the player
         moves within the grid, and deals with edge cases such as being 
-        immediately adjacent to an opponent. Used in perform_action.
+        immediately adjacent to an opponent. play checks moves with
+        legal_pawn_codes instead, which gives the same answers.
 
         player:     Current player (Player)
         dir:        Direction of movement, also can think of it as a 
                     displacement vector (int, int)
         '''
         new_player_pos = (player.pos[0] + dir[0], player.pos[1] + dir[1])
-        if new_player_pos not in self.graph.nodes:
+        if new_player_pos not in SQUARE_INDEX:
             return False
         other_player = self.players[1 - player.player_id]
         if self.dist(player.pos, new_player_pos) == 1:
-            return new_player_pos != other_player.pos and self.graph.has_edge(player.pos, new_player_pos)
+            return new_player_pos != other_player.pos and self.has_edge(player.pos, new_player_pos)
 
         elif self.dist(player.pos, new_player_pos) == 2:
             behind_opponent = (2 * other_player.pos[0] - player.pos[0], 2 * other_player.pos[1] - player.pos[1])
@@ -136,15 +341,15 @@ class Game():
                              other_player.pos[1] + other_player.pos[0] - player.pos[0])
             diagonal_left = (other_player.pos[0] - other_player.pos[1] + player.pos[1], 
                              other_player.pos[1] - other_player.pos[0] + player.pos[0])
-            if not self.graph.has_edge(player.pos, other_player.pos):
+            if not self.has_edge(player.pos, other_player.pos):
                 return False
-            if self.graph.has_edge(other_player.pos, behind_opponent):
+            if self.has_edge(other_player.pos, behind_opponent):
                 return new_player_pos == behind_opponent
-            elif behind_opponent[0] in list(range(1,10)) and behind_opponent[1] in list(range(1,10)):
+            elif behind_opponent in SQUARE_INDEX:
                 if new_player_pos == diagonal_right:
-                    return self.graph.has_edge(other_player.pos, diagonal_right) 
+                    return self.has_edge(other_player.pos, diagonal_right)
                 elif new_player_pos == diagonal_left:
-                    return self.graph.has_edge(other_player.pos, diagonal_left)   
+                    return self.has_edge(other_player.pos, diagonal_left)
             return False
         else:
             return False
@@ -163,33 +368,183 @@ class Game():
         pos:            Position of center of wall (float, float)
         orientation:    Specified horizontal or vertical wall (str)
         '''
-        if player.remaining_walls == 0:
+        code = ACTION_CODES.get(("wall", (pos, orientation)))
+        if code is None:
             return False
+        return self.is_legal_wall_code(player, code, undo_successful_wall)
 
-        allowed_pos = [x + 0.5 for x in list(range(1,10))]
-        if pos[0] not in allowed_pos or pos[1] not in allowed_pos or (pos, "horizontal") in self.walls or (pos, "vertical") in self.walls:
-            return False
 
-        surrounding_nodes = [(pos[0] - 0.5, pos[1] - 0.5), (pos[0] + 0.5, pos[1] - 0.5), (pos[0] + 0.5, pos[1] + 0.5), (pos[0] - 0.5, pos[1] + 0.5)]
-        if orientation == "horizontal":
-            connections = ((surrounding_nodes[0], surrounding_nodes[3]), (surrounding_nodes[1], surrounding_nodes[2]))
-        elif orientation == "vertical":
-            connections = ((surrounding_nodes[0], surrounding_nodes[1]), (surrounding_nodes[2], surrounding_nodes[3]))
-        else:
-            return False
-        
-        if connections[0] not in self.graph.edges or connections[1] not in self.graph.edges:
+
+    def is_legal_wall_code(self, player, code, undo_successful_wall = False):
+        '''
+        Checks if a player can place the wall with the given code.
+        The wall's edges stay blocked if it is legal, unless
+        undo_successful_wall is set.
+
+        player:     Current player (Player)
+        code:       Wall action code (int)
+        '''
+        if player.remaining_walls == 0 or self.wall_codes & WALL_CONFLICTS[code]:
             return False
-        self.graph.remove_edge(connections[0][0], connections[0][1])
-        self.graph.remove_edge(connections[1][0], connections[1][1])
+        return self.wall_keeps_paths(code, undo_successful_wall)
+
+
+
+    def wall_keeps_paths(self, code, undo_successful_wall = False):
+        '''
+        Checks that a wall which fits on the board leaves both
+        players a path to their goal. The wall's edges stay
+        blocked if it is legal, unless undo_successful_wall is set.
+
+        code:   Wall action code (int)
+        '''
+        # A wall can only cut a player off if it closes a loop with the border or
+        # other walls, which needs at least two of its corners to be touched already.
+        edges = WALL_CODE_EDGES[code]
+        touching = 0
+        for point in WALL_CODE_POINTS[code]:
+            if self.wall_touches[point]:
+                touching += 1
+        if touching < 2:
+            if not undo_successful_wall:
+                self.blocked |= edges
+            return True
+
+        path_cache = self.path_cache[:]
+        self.blocked |= edges
         legal = self.check_path_to_end(self.players[0])[0] and self.check_path_to_end(self.players[1])[0]
         if not legal or undo_successful_wall:
-            self.graph.add_edge(connections[0][0], connections[0][1])
-            self.graph.add_edge(connections[1][0], connections[1][1])
+            self.blocked &= ~edges
+            self.path_cache = path_cache
         return legal
 
 
 
+    def legal_pawn_moves(self, player):
+        '''
+        Returns the directions the player can legally move in,
+        in the order of DIRECTIONS. Gives the same result as
+        calling is_legal_move on every direction.
+
+        player:     Current player (Player)
+        '''
+        return [DIRECTIONS[code] for code in self.legal_pawn_codes(player)]
+
+
+
+    def legal_pawn_codes(self, player):
+        '''
+        Returns the action codes of the legal pawn moves of a
+        player in increasing order.
+
+        player:     Current player (Player)
+        '''
+        sq = SQUARE_INDEX[player.pos]
+        opponent = SQUARE_INDEX[self.players[1 - player.player_id].pos]
+        blocked = self.blocked
+        codes = []
+        for dir, dest, edge in STEPS[sq]:
+            if blocked & edge:
+                continue
+            if dest != opponent:
+                codes.append(DIRECTION_ORDER[dir])
+                continue
+            straight, diagonals = JUMPS[sq, opponent]
+            if straight is None:
+                continue
+            if not blocked & straight[2]:
+                codes.append(DIRECTION_ORDER[straight[0]])
+            else:
+                for diagonal_dir, _, diagonal_edge in diagonals:
+                    if not blocked & diagonal_edge:
+                        codes.append(DIRECTION_ORDER[diagonal_dir])
+        codes.sort()
+        return codes
+
+
+
+    def mobility(self, player, wall_mask = 0):
+        '''
+        Counts the legal pawn moves of a player plus the wall
+        placements that fit in the given slots. Walls are only
+        checked against the occupied slots and blocked edges,
+        not pathfinding, so a wall that would cut a player off
+        is still counted.
+
+        player:     Player to count moves for (Player)
+        wall_mask:  Mask of the wall slots to count walls in (int)
+        '''
+        count = len(self.legal_pawn_moves(player))
+        if player.remaining_walls == 0:
+            return count
+        wall_mask &= ~self.wall_slots
+        blocked = self.blocked
+        while wall_mask:
+            low_bit = wall_mask & -wall_mask
+            slot = low_bit.bit_length() - 1
+            wall_mask ^= low_bit
+            if not blocked & WALL_EDGES[slot, "vertical"]:
+                count += 1
+            if not blocked & WALL_EDGES[slot, "horizontal"]:
+                count += 1
+        return count
+
+
+
+    def legal_actions(self, player = None):
+        '''
+        Yields every legal action of a player as (action_type, action),
+        pawn moves first and then walls, without trying them out
+        through perform_action. Walls are generated lazily, so the
+        game must be back in the same state whenever the generator
+        is resumed.
+
+        player:     Player to generate actions for, defaults to the
+                    player whose turn it is (Player)
+        '''
+        for code in self.legal_codes(player):
+            yield ACTIONS[code]
+
+
+
+    def legal_codes(self, player = None):
+        '''
+        Yields the codes of every legal action of a player in the
+        same order as legal_actions, with the same need for the
+        game to be unchanged whenever the generator is resumed.
+
+        player:     Player to generate actions for, defaults to the
+                    player whose turn it is (Player)
+        '''
+        if player is None:
+            player = self.players[self.cur_player]
+        yield from self.legal_pawn_codes(player)
+
+        if player.remaining_walls == 0:
+            return
+        for code in WALL_CODE_ORDER:
+            if not self.wall_codes & WALL_CONFLICTS[code] and self.wall_keeps_paths(code, undo_successful_wall = True):
+                yield code
+
+
+
+    def compute_zobrist(self):
+        '''
+        Computes the Zobrist key of the current state from
+        scratch. perform_action and undo_last_move keep
+        self.zobrist up to date, so this is only needed after
+        editing the players or walls by hand.
+        '''
+        key = ZOBRIST_SIDE if self.cur_player else 0
+        for player in self.players:
+            key ^= ZOBRIST_PAWN[player.player_id][SQUARE_INDEX[player.pos]]
+            key ^= ZOBRIST_WALLS_LEFT[player.player_id][player.remaining_walls]
+        for pos, orientation in self.walls:
+            key ^= ZOBRIST_WALL[WALL_SLOTS[pos], orientation]
+        return key
+
+
+
     def check_win_condition(self):
         '''
         Checks to see if either player has made it to
@@ -222,7 +577,7 @@ class Game():
         while len(queue) > 0:
             cur = queue.pop(0)
             path_len = lens.pop(0)
-            for neighbor in self.graph.neighbors(cur):
+            for neighbor in self.neighbors(cur):
                 if neighbor[1] == goal_row:
                     return True, path_len
                 elif neighbor not in visited:
@@ -233,33 +588,126 @@ class Game():
     
     def check_path_to_end(self, player):
         '''
-        Uses A* search to determine whether a certain player
-        can make it to the other side of the board given
-        current wall placements. Returns True if the
-        player can, and False if the player can not. 
+        Determines whether a certain player can make it to the
+        other side of the board given current wall placements.
+        Returns True and the length of the shortest path if the
+        player can, and False if the player can not.
+
+        The shortest path of each player is cached, and A* is
+        only rerun when a wall cuts an edge of the cached path
+        or the player has stepped off it. Walls only ever remove
+        edges, so a cached path that is still open is still a
+        shortest path; undo_last_move restores the cache as it
+        was before the undone action.
 
         player:     Current player (Player)
         '''
-        goal_row = 9 - 8 * player.player_id
-        start = player.pos
-        def heuristic(pos):
-            return self.dist(pos, (pos[0],goal_row))
+        path, i = self.cached_path(player)
+        if path is None:
+            return False, None
+        return True, len(path) - 1 - i
+
+
+
+    def shortest_path(self, player):
+        '''
+        Returns a shortest path from the player to their goal
+        row as a list of positions, starting with the player's
+        own position, or None if the player is cut off.
+
+        player:     Current player (Player)
+        '''
+        path, i = self.cached_path(player)
+        if path is None:
+            return None
+        return [SQUARES[sq] for sq in path[i:]]
+
+
+
+    def cached_path(self, player):
+        '''
+        Returns the cached shortest path of a player as a tuple
+        of squares together with the index of the player's square
+        on it, recomputing the path if it is no longer valid.
+        Returns (None, 0) if the player is cut off.
+
+        player:     Current player (Player)
+        '''
+        start = SQUARE_INDEX[player.pos]
+        entry = self.path_cache[player.player_id]
+        if entry is not None and not self.blocked & entry[1]:
+            path = entry[0]
+            if start in path:
+                return path, path.index(start)
+        entry = self.find_path(start, 8 - 8 * player.player_id)
+        if entry is None:
+            return None, 0
+        self.path_cache[player.player_id] = entry
+        return entry[0], 0
+
+
+
+    def find_path(self, start, goal_y):
+        '''
+        Uses A* search to find a shortest path from a square to
+        a row of the board. Returns the squares of the path and
+        the mask of the edges it crosses, or None if the row can
+        not be reached.
+
+        start:      Square index to start from (int)
+        goal_y:     Row to reach, counted from 0 (int)
+        '''
+        blocked = self.blocked
         g_values = {start: 0}
-        queue = []
-        heapq.heappush(queue, (g_values[start] + heuristic(start), start))
+        parents = {start: None}
+        queue = [(abs(start // 9 - goal_y), 0, start)]
         while queue:
-            score, node = heapq.heappop(queue)
-            if node[1] == goal_row:
-                return True, score
-            tentative_g = g_values[node] + 1
-            for neighbor in self.graph.neighbors(node):
-                if neighbor not in g_values:
-                    g_values[neighbor] = tentative_g
-                    heapq.heappush(queue, (tentative_g + heuristic(neighbor), neighbor))
-        return False, None
+            score, g, node = heapq.heappop(queue)
+            if node // 9 == goal_y:
+                path = [node]
+                mask = 0
+                while parents[node] is not None:
+                    node, edge = parents[node]
+                    path.append(node)
+                    mask |= edge
+                path.reverse()
+                return tuple(path), mask
+            if g > g_values[node]:
+                continue
+            g += 1
+            for neighbor, edge in NEIGHBORS[node]:
+                if not blocked & edge and g < g_values.get(neighbor, 81):
+                    g_values[neighbor] = g
+                    parents[neighbor] = (node, edge)
+                    heapq.heappush(queue, (g + abs(neighbor // 9 - goal_y), g, neighbor))
+        return None
 
         
 
+    def has_edge(self, pos1, pos2):
+        '''
+        Checks whether two squares are adjacent and not
+        separated by a wall.
+
+        pos1:   First position (int, int)
+        pos2:   Second position (int, int)
+        '''
+        edge = EDGE_MASK.get((pos1, pos2))
+        return edge is not None and not self.blocked & edge
+
+
+
+    def neighbors(self, pos):
+        '''
+        Yields the squares reachable from a position in
+        a single step, ignoring the other player.
+
+        pos:    Position (int, int)
+        '''
+        for neighbor, edge in NEIGHBORS[SQUARE_INDEX[pos]]:
+            if not self.blocked & edge:
+                yield SQUARES[neighbor]
+
 
 
     def dist(self, pos1, pos2): 
@@ -269,4 +717,90 @@ class Game():
         pos1:   First position (int, int)
         pos2:   Second position (int, int)
         '''
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])    
\ No newline at end of file
+        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+
+
+
+class GameState():
+    __slots__ = ("packed", "walls")
+
+    def __init__(self, packed, walls):
+        '''
+        Immutable snapshot of a game position packed into two
+        ints, so that it is cheap to copy, hash, compare and
+        send to another process. The history of actions is not
+        part of the state.
+
+        packed:     Square of player 0 in bits 0-6, square of
+                    player 1 in bits 7-13, walls left of player 0
+                    in bits 14-17 and of player 1 in bits 18-21,
+                    and the player to move in bit 22 (int)
+        walls:      Slots holding a horizontal wall in bits 0-63
+                    and a vertical wall in bits 64-127 (int)
+        '''
+        object.__setattr__(self, "packed", packed)
+        object.__setattr__(self, "walls", walls)
+
+    @classmethod
+    def from_game(cls, game):
+        '''
+        Packs the current position of a game.
+
+        game:   Game to take the position from (Game)
+        '''
+        p0, p1 = game.players
+        packed = (SQUARE_INDEX[p0.pos] | SQUARE_INDEX[p1.pos] << 7
+                  | p0.remaining_walls << 14 | p1.remaining_walls << 18 | game.cur_player << 22)
+        walls = 0
+        for pos, orientation in game.walls:
+            walls |= 1 << (WALL_SLOTS[pos] + (64 if orientation == "vertical" else 0))
+        return cls(packed, walls)
+
+    def to_game(self):
+        '''
+        Returns a new Game set up in this position, with an
+        empty action history.
+        '''
+        game = Game()
+        p0, p1 = game.players
+        packed = self.packed
+        p0.pos = SQUARES[packed & 0x7f]
+        p1.pos = SQUARES[packed >> 7 & 0x7f]
+        p0.remaining_walls = packed >> 14 & 0xf
+        p1.remaining_walls = packed >> 18 & 0xf
+        game.cur_player = packed >> 22 & 1
+        walls = self.walls
+        while walls:
+            low_bit = walls & -walls
+            bit = low_bit.bit_length() - 1
+            walls ^= low_bit
+            slot, orientation = (bit - 64, "vertical") if bit >= 64 else (bit, "horizontal")
+            game.walls.add((WALL_CENTERS[slot], orientation))
+            game.blocked |= WALL_EDGES[slot, orientation]
+            game.wall_slots |= 1 << slot
+            game.wall_codes |= 1 << (2 * slot + ORIENTATIONS.index(orientation))
+            for point in WALL_POINTS[slot, orientation]:
+                game.wall_touches[point] += 1
+        game.check_win_condition()
+        game.zobrist = game.compute_zobrist()
+        return game
+
+    @property
+    def cur_player(self):
+        return self.packed >> 22 & 1
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self.packed == other.packed and self.walls == other.walls
+
+    def __hash__(self):
+        return hash((self.packed, self.walls))
+
+    def __reduce__(self):
+        return (GameState, (self.packed, self.walls))
+
+    def __repr__(self):
+        return f"GameState({self.packed:#x}, {self.walls:#x})"
@@ -0,0 +1,193 @@
+# GAME ANALYSIS #
+# Re-scores every position of the games in a record file (see Implementation/records.py) #
+# with nMiniMaxPruningBot across a process pool, and appends one JSON line per position   #
+# with the evaluation of the move played and the best alternative. Positions already in  #
+# the result file are skipped, so an interrupted run picks up where it stopped. Example:  #
+#   python analyze.py games.rec analysis.jsonl --depth 2 --processes 4                     #
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'Implementation'))
+from v1 import decode_action
+from records import read_records, replay, action_to_notation
+sys.path.append(os.path.join(HERE, 'Bots'))
+from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+from transposition_table import TranspositionTable
+
+BATCH = 64 # positions handed to the pool at a time, per worker
+
+worker_tables = {} # player_id -> transposition table owned by a worker process, kept between positions
+worker_tt_size = None
+
+
+
+def init_worker(tt_size):
+    global worker_tt_size
+    worker_tt_size = tt_size
+    worker_tables.clear()
+
+
+
+def analyze_position(task):
+    '''
+    Searches one position of a game in a worker and returns its
+    result line as a dict. Scores are from the point of view of
+    the player to move, and loss is how much worse the move played
+    scored than the best move.
+
+    task:   (game_index, ply, codes, depth, time_limit) where codes
+            holds the game's actions up to and including the one
+            played in this position
+    '''
+    game_index, ply, codes, depth, time_limit = task
+    game = replay(codes[:ply])
+    player_id = game.cur_player
+    bot = nMiniMaxPruningBot(game, player_id, depth, collect_stats = False, use_old_entries = False)
+    if worker_tt_size is not None:
+        # Scores are stored from the bot's point of view, so the two sides never share a table.
+        # Entries left by other positions only order moves, so that a result never depends on
+        # which positions the worker happened to analyse before
+        if player_id not in worker_tables:
+            worker_tables[player_id] = TranspositionTable(worker_tt_size)
+        bot.tt = worker_tables[player_id]
+    best_score, best_move = bot.choose_move(time_limit = time_limit, max_depth = depth)
+    searched_depth = bot.completed_depth
+
+    played = decode_action(codes[ply])
+    if played == best_move:
+        played_score = best_score
+    else:
+        # Search the move played with a full window, so that its score is exact
+        # rather than the bound the root search may have left for it
+        game.perform_action(bot.bot, played[0], played[1])
+        bot.root_ply = None
+        bot.deadline = None
+        bot.max_nodes = None
+        played_score, _ = bot.minimax(-1e20, 1e20, game, searched_depth - 1, False)
+        game.undo_last_move()
+
+    return {
+        "game": game_index,
+        "ply": ply,
+        "player": player_id,
+        "played": action_to_notation(game, played[0], played[1]),
+        "best": action_to_notation(game, best_move[0], best_move[1]),
+        "score": best_score,
+        "played_score": played_score,
+        "loss": max(0.0, best_score - played_score),
+        "depth": searched_depth,
+    }
+
+
+
+def finished_positions(path):
+    '''
+    Returns the set of (game, ply) already in a result file. A
+    line cut off by an interrupted run is ignored.
+
+    path:   Result file (str)
+    '''
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                done.add((result["game"], result["ply"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+
+def positions(record_path, done, depth, time_limit, max_games = None):
+    # Lazily yields the tasks for every position not analysed yet
+    for game_index, (_, codes) in enumerate(itertools.islice(read_records(record_path), max_games)):
+        for ply in range(len(codes)):
+            if (game_index, ply) not in done:
+                yield game_index, ply, codes, depth, time_limit
+
+
+
+def analyze(record_path, result_path, depth = 2, time_limit = None, processes = None, max_games = None,
+            tt_size = 1 << 18, progress = None):
+    '''
+    Analyses every position of the games in a record file and
+    appends the results to a JSON lines file as they come in.
+    Returns (positions analysed, positions skipped).
+
+    record_path:    Record file to read games from (str)
+    result_path:    Result file to append to (str)
+    depth:          Search depth per position (int)
+    time_limit:     Seconds per position, or None to always search
+                    to depth (float)
+    processes:      Worker processes, defaults to the number of cores (int)
+    max_games:      Only analyse the first max_games games (int)
+    tt_size:        Size of each worker's transposition table (int)
+    progress:       Called with the number of positions analysed (callable)
+    '''
+    done = finished_positions(result_path)
+    with open(result_path, "ab") as f:
+        # Finish a line left half-written by an interrupted run
+        if f.tell() > 0:
+            with open(result_path, "rb") as last:
+                last.seek(-1, os.SEEK_END)
+                if last.read(1) != b"\n":
+                    f.write(b"\n")
+
+    analysed = 0
+    tasks = positions(record_path, done, depth, time_limit, max_games)
+    with multiprocessing.Pool(processes, initializer = init_worker, initargs = (tt_size,)) as pool, \
+         open(result_path, "a") as out:
+        batch_size = BATCH * (processes or os.cpu_count() or 1)
+        while True:
+            # Hand out positions a batch at a time so that a huge record file
+            # is never queued up in memory all at once
+            batch = list(itertools.islice(tasks, batch_size))
+            if not batch:
+                break
+            for result in pool.imap_unordered(analyze_position, batch):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                analysed += 1
+                if progress is not None:
+                    progress(analysed)
+    return analysed, len(done)
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Score every position of recorded games to find blunders")
+    parser.add_argument("records", help = "game record file, such as one written by tournament.py --record")
+    parser.add_argument("output", help = "JSON lines file to append the results to")
+    parser.add_argument("--depth", type = int, default = 2)
+    parser.add_argument("--time-limit", type = float, default = None, help = "seconds per position")
+    parser.add_argument("--processes", type = int, default = None)
+    parser.add_argument("--games", type = int, default = None, help = "only analyse the first GAMES games")
+    parser.add_argument("--blunder", type = float, default = 3.0, help = "loss at which a move is reported as a blunder")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    def progress(count):
+        print(f"\r{count} positions, {time.perf_counter() - start:.0f}s", end = "", file = sys.stderr, flush = True)
+
+    analysed, skipped = analyze(args.records, args.output, args.depth, args.time_limit, args.processes, args.games,
+                                progress = progress)
+    print(file = sys.stderr)
+    print(f"analysed {analysed} positions, skipped {skipped} already in {args.output}")
+    blunders = 0
+    with open(args.output) as f:
+        for line in f:
+            try:
+                blunders += json.loads(line)["loss"] >= args.blunder
+            except (ValueError, KeyError, TypeError):
+                continue
+    print(f"{blunders} moves lost {args.blunder} or more")
@@ -1,14 +1,16 @@
 import pygame
 import sys
 import random
+import threading
 import time
 
 sys.path.append('./Implementation')
-from v1 import Game
+from v1 import Game, ACTION_CODES
 sys.path.append('./Bots')
 from n_minimax_bot import nMiniMaxBot
 from minimax_bot import MiniMaxBot
 from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+from mcts_bot import MCTSBot
 
 # Initialize pygame
 pygame.init()
@@ -33,6 +35,13 @@ WALL_SELECTION_AREA_HEIGHT = 100  # Height for the wall selection area
 SELECTED_WALL_COLOR = (255, 255, 0)  # Color for the selected wall
 wall_selected = None  # Keep track of the selected wall
 potential_wall_positions = []  # Keep track of potential positions for placing the wall
+PROGRESS_COLOR = (255, 223, 0)  # Color of the bar showing how deep the bot has searched
+PONDER = True  # Let the bot search on the human's turn
+
+# Regions of the screen that are redrawn separately, so that a frame only updates what changed
+COUNTER_AREA = pygame.Rect(0, 0, SCREEN_WIDTH, BOARD_OFFSET_Y)
+BOARD_AREA = pygame.Rect(0, BOARD_OFFSET_Y, SCREEN_WIDTH, BOARD_LEN)
+STATUS_AREA = pygame.Rect(0, BOARD_OFFSET_Y + BOARD_LEN, SCREEN_WIDTH, SCREEN_HEIGHT - WALL_SELECTION_AREA_HEIGHT - BOARD_OFFSET_Y - BOARD_LEN)
 
 
 # Set up the display
@@ -42,7 +51,7 @@ pygame.display.set_caption('Quoridor Game Visualization')
 
 def draw_board(game):
     """Draws the Quoridor board."""
-    screen.fill(BACKGROUND_COLOR)  # Gray background
+    screen.fill(BACKGROUND_COLOR, BOARD_AREA)  # Gray background
     for row in range(1, BOARD_SIZE + 1):
         for col in range(1, BOARD_SIZE + 1):
             # Adjust for 1-based indexing of the tiles
@@ -52,6 +61,7 @@ def draw_board(game):
 def draw_wall_counters(game):
     """Displays the number of walls each player has left."""
     font = pygame.font.Font(None, 36)
+    screen.fill(BACKGROUND_COLOR, COUNTER_AREA)
 
     # Player 1 Wall Counter
     p1_counter_rect = pygame.Rect(BOARD_OFFSET_X, 0, 50, 50)
@@ -148,13 +158,21 @@ def draw_highlighted_squares(pawn, legal_moves):
 def get_legal_moves(game, player):
     """Gets the legal moves for the selected player."""
     legal_moves = []
-    directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
-    for d in directions:
-        if game.is_legal_move(player, d):
-            new_pos = (player.pos[0] + d[0], player.pos[1] + d[1])
-            legal_moves.append(new_pos)
+    for d in game.legal_pawn_moves(player):
+        new_pos = (player.pos[0] + d[0], player.pos[1] + d[1])
+        legal_moves.append(new_pos)
     return legal_moves
 
+def draw_status(text, progress = None):
+    """Shows a line of text under the board, with a progress bar filled up to progress (0 to 1) if given."""
+    screen.fill(BACKGROUND_COLOR, STATUS_AREA)
+    font = pygame.font.Font(None, 30)
+    screen.blit(font.render(text, True, (0, 0, 0)), (BOARD_OFFSET_X, STATUS_AREA.y + 8))
+    if progress is not None:
+        bar_rect = pygame.Rect(SCREEN_WIDTH - BOARD_OFFSET_X - BOARD_LEN // 4, STATUS_AREA.y + 8, BOARD_LEN // 4, 18)
+        pygame.draw.rect(screen, PROGRESS_COLOR, (bar_rect.x, bar_rect.y, int(bar_rect.width * min(progress, 1)), bar_rect.height))
+        pygame.draw.rect(screen, (60, 60, 60), bar_rect, 2)
+
 def is_pawn_clicked(pawn, mouse_pos):
     """Checks if a pawn is clicked."""
     center = ((pawn[0] - 1) * SQUARE_SIZE + SQUARE_SIZE // 2 + BOARD_OFFSET_X,
@@ -164,90 +182,264 @@ def is_pawn_clicked(pawn, mouse_pos):
     return distance < radius
 
 
+class BotThinker:
+    def __init__(self, bot, ponder = False):
+        """
+        Runs a bot's search in a background thread so that the
+        window keeps responding while it thinks. The bot plays on
+        its own copy of the game, bot.game, which is brought up to
+        date with the displayed game before every search and is
+        only touched by the thread while a search runs.
+
+        With ponder set, the bot also searches on the human's turn:
+        it goes through the human's replies, most likely first, and
+        works out its answer to each. If the human then plays a
+        reply it has answered, the answer is played at once, and if
+        it plays the reply being searched the search carries on as
+        the bot's own. Otherwise the pondering is stopped and a new
+        search starts, with the transposition table already filled
+        in. Pondering needs a bot with best_action, predicted_replies
+        and a stop flag, such as nMiniMaxPruningBot.
+
+        bot:    Bot created on a Game of its own
+        ponder: Search on the human's turn as well (bool)
+        """
+        self.bot = bot
+        self.can_ponder = ponder and hasattr(bot, "predicted_replies")
+        self.thread = None
+        self.job = None  # "move" or "ponder"
+        self.plies = None  # Length of the game when the job started
+        self.result = None
+        self.started = None
+        self.answers = {}  # Human reply code -> action code of the bot's answer
+        self.pondering = None  # Reply being searched
+        self.ponder_until = None  # Reply to stop pondering after
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    def sync(self, game):
+        # Bring the bot's copy of the game up to date with the displayed one
+        search_game = self.bot.game
+        while search_game.codes != game.codes[:len(search_game.codes)]:
+            search_game.undo()
+        for code in game.codes[len(search_game.codes):]:
+            search_game.play(code)
+
+    def start(self, game, job, target, *args):
+        self.sync(game)
+        self.job = job
+        self.plies = len(game.codes)
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target = target, args = args, daemon = True)
+        self.thread.start()
+
+    def run(self):
+        search_game = self.bot.game
+        plies = len(search_game.codes)
+        self.bot.make_move()
+        if len(search_game.codes) > plies:
+            self.result = search_game.codes[plies]
+
+    def run_ponder(self, replies):
+        search_game = self.bot.game
+        for reply in replies:
+            self.pondering = reply
+            search_game.play(reply)
+            answer = self.bot.best_action()
+            search_game.undo()
+            if answer is None or self.bot.stop:
+                break
+            self.answers[reply] = ACTION_CODES[answer]
+            if reply == self.ponder_until:
+                break
+        self.pondering = None
+
+    def cancel(self):
+        """Stops the running search, waiting for the thread to finish."""
+        if self.thread is not None:
+            self.bot.stop = True
+            self.thread.join()
+            self.bot.stop = False
+        self.thread = None
+        self.job = None
+        self.answers = {}
+        self.pondering = None
+        self.ponder_until = None
+
+    def ponder(self, game):
+        """Starts pondering on the human's turn, unless the bot cannot ponder or already is."""
+        if not self.can_ponder or self.thread is not None:
+            return
+        self.answers = {}
+        self.pondering = None
+        self.ponder_until = None
+        self.sync(game)
+        self.start(game, "ponder", self.run_ponder, self.bot.predicted_replies())
+
+    def move(self, game):
+        """Returns the action code the bot plays in the position of game once it has one, and None while it is still thinking."""
+        if self.job == "ponder":
+            reply = game.codes[-1] if len(game.codes) == self.plies + 1 else None
+            if reply is not None and reply in self.answers:
+                answer = self.answers[reply]
+                self.cancel()
+                self.ponder_hits += 1
+                return answer
+            if reply is not None and reply == self.pondering:
+                self.ponder_until = reply
+                return None
+            self.cancel()
+            self.ponder_misses += 1
+
+        if self.thread is None:
+            self.result = None
+            self.start(game, "move", self.run)
+            return None
+        if self.thread.is_alive():
+            return None
+        self.thread = None
+        self.job = None
+        return self.result
+
+    def thinking(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def progress(self):
+        """Returns (text, fraction done or None) describing the running search."""
+        depth = getattr(self.bot, "completed_depth", None)
+        max_depth = getattr(self.bot, "n", None)
+        nodes = getattr(self.bot, "nodes", None)
+        text = f"Bot thinking {time.monotonic() - self.started:.1f}s"
+        if depth is not None and max_depth:
+            text += f", depth {depth}/{max_depth}"
+        if nodes is not None:
+            text += f", {nodes} nodes"
+        return text, depth / max_depth if depth is not None and max_depth else None
+
+
 def main():
     selected_player = None
     selected_wall = None
     legal_moves = []
     potential_wall_positions = []
     clock = pygame.time.Clock()
+    thinker = BotThinker(bot, ponder = PONDER)
+    game_over_at = None
+    drawn = {}  # Region -> what is currently drawn there
+    # Let the window take the interpreter back from the search thread sooner, so frames stay on time
+    sys.setswitchinterval(0.001)
 
+    screen.fill(BACKGROUND_COLOR)
+    draw_selectable_walls()
+    pygame.display.flip()
 
     while True:
-        if game.cur_player == bot_player_id and game.winner == None:
-            bot.make_move()
-        elif game.winner == None:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-
-                    button_height = WALL_SELECTION_AREA_HEIGHT // 2
-                    hor_button_rect = pygame.Rect(BOARD_OFFSET_X, SCREEN_HEIGHT - WALL_SELECTION_AREA_HEIGHT, BOARD_LEN // 4, button_height)
-                    ver_button_rect = pygame.Rect(SCREEN_WIDTH - BOARD_OFFSET_X - BOARD_LEN // 4, SCREEN_HEIGHT - WALL_SELECTION_AREA_HEIGHT, BOARD_LEN // 4, button_height)
-                    if hor_button_rect.collidepoint(mouse_pos):
-                        selected_wall = 'horizontal'
-                        potential_wall_positions = get_potential_wall_positions(game)
-                        selected_player = None
-                        legal_moves = []
-                    elif ver_button_rect.collidepoint(mouse_pos):
-                        selected_wall = 'vertical'
-                        potential_wall_positions = get_potential_wall_positions(game)
-                        selected_player = None
-                        legal_moves = []
-                    elif selected_wall:
-                        # Check for wall placement
-                        circle_radius = SQUARE_SIZE // 8
-                        for pos in potential_wall_positions:
-                            screen_x = (pos[0] - 1) * SQUARE_SIZE + BOARD_OFFSET_X + SQUARE_SIZE
-                            screen_y = (BOARD_SIZE - pos[1]) * SQUARE_SIZE + BOARD_OFFSET_Y
-                            wall_rect = pygame.Rect(screen_x - circle_radius, screen_y - circle_radius, circle_radius * 2, circle_radius * 2)
-                            if wall_rect.collidepoint(mouse_pos):
-                                pos = (pos[0] + 0.5, pos[1] + 0.5)
-                                if game.perform_action(game.players[game.cur_player], "wall", (pos, selected_wall)):
-                                    selected_wall = None
-                                    potential_wall_positions = []
-                                    break
-                        selected_wall = None
-                        potential_wall_positions = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN and game.cur_player == human_player_id and game.winner == None:
+                mouse_pos = pygame.mouse.get_pos()
 
+                button_height = WALL_SELECTION_AREA_HEIGHT // 2
+                hor_button_rect = pygame.Rect(BOARD_OFFSET_X, SCREEN_HEIGHT - WALL_SELECTION_AREA_HEIGHT, BOARD_LEN // 4, button_height)
+                ver_button_rect = pygame.Rect(SCREEN_WIDTH - BOARD_OFFSET_X - BOARD_LEN // 4, SCREEN_HEIGHT - WALL_SELECTION_AREA_HEIGHT, BOARD_LEN // 4, button_height)
+                if hor_button_rect.collidepoint(mouse_pos):
+                    selected_wall = 'horizontal'
+                    potential_wall_positions = get_potential_wall_positions(game)
+                    selected_player = None
+                    legal_moves = []
+                elif ver_button_rect.collidepoint(mouse_pos):
+                    selected_wall = 'vertical'
+                    potential_wall_positions = get_potential_wall_positions(game)
+                    selected_player = None
+                    legal_moves = []
+                elif selected_wall:
+                    # Check for wall placement
+                    circle_radius = SQUARE_SIZE // 8
+                    for pos in potential_wall_positions:
+                        screen_x = (pos[0] - 1) * SQUARE_SIZE + BOARD_OFFSET_X + SQUARE_SIZE
+                        screen_y = (BOARD_SIZE - pos[1]) * SQUARE_SIZE + BOARD_OFFSET_Y
+                        wall_rect = pygame.Rect(screen_x - circle_radius, screen_y - circle_radius, circle_radius * 2, circle_radius * 2)
+                        if wall_rect.collidepoint(mouse_pos):
+                            pos = (pos[0] + 0.5, pos[1] + 0.5)
+                            if game.perform_action(game.players[game.cur_player], "wall", (pos, selected_wall)):
+                                selected_wall = None
+                                potential_wall_positions = []
+                                break
+                    selected_wall = None
+                    potential_wall_positions = []
+
+                else:
+                    # Check for pawn movement
+                    for player in game.players:
+                        if player.player_id == game.cur_player:
+                            if is_pawn_clicked(player.pos, mouse_pos):
+                                selected_player = player
+                                legal_moves = get_legal_moves(game, player)
+                                break
                     else:
-                        # Check for pawn movement
-                        for player in game.players:
-                            if player.player_id == game.cur_player:
-                                if is_pawn_clicked(player.pos, mouse_pos):
-                                    selected_player = player
-                                    legal_moves = get_legal_moves(game, player)
+                        if selected_player:
+                            for move in legal_moves:
+                                if is_move_clicked(move, mouse_pos):
+                                    game.perform_action(selected_player, "move", (move[0] - selected_player.pos[0], move[1] - selected_player.pos[1]))
+                                    selected_player = None
+                                    legal_moves = []
                                     break
-                        else:
-                            if selected_player:
-                                for move in legal_moves:
-                                    if is_move_clicked(move, mouse_pos):
-                                        game.perform_action(selected_player, "move", (move[0] - selected_player.pos[0], move[1] - selected_player.pos[1]))
-                                        selected_player = None
-                                        legal_moves = []
-                                        break
+
+        # The bot searches in the background and its move is picked up once it is done
+        if game.cur_player == bot_player_id and game.winner == None:
+            code = thinker.move(game)
+            if code is not None:
+                game.play(code)
+        elif game.winner == None:
+            thinker.ponder(game)
+
+        if game.winner != None:
+            if game_over_at is None:
+                game_over_at = time.monotonic()
+                thinker.cancel()
+            elif time.monotonic() - game_over_at > 7:
+                pygame.quit()
+                sys.exit()
+            status = (f"Player {game.winner + 1} wins", None)
+        elif game.cur_player == bot_player_id:
+            status = thinker.progress()
+        elif thinker.thinking():
+            status = (f"Your move, bot pondering ({len(thinker.answers)} replies answered)", None)
         else:
-            time.sleep(7)
-            quit()
-        draw_board(game)
-        draw_pawns(game)
-        draw_walls(game)
-        draw_selectable_walls()
-        draw_wall_counters(game)
-        if legal_moves:
-            draw_highlighted_squares(game, legal_moves)
-        if potential_wall_positions:
-            highlight_potential_wall_positions(potential_wall_positions)
-        pygame.display.flip()
+            status = ("Your move", None)
+
+        # Only redraw and update the regions whose contents changed since the last frame
+        dirty = []
+        board_view = (len(game.codes), tuple(legal_moves), tuple(potential_wall_positions))
+        if drawn.get("board") != board_view:
+            draw_board(game)
+            draw_pawns(game)
+            draw_walls(game)
+            if legal_moves:
+                draw_highlighted_squares(game, legal_moves)
+            if potential_wall_positions:
+                highlight_potential_wall_positions(potential_wall_positions)
+            drawn["board"] = board_view
+            dirty.append(BOARD_AREA)
+        counter_view = tuple(player.remaining_walls for player in game.players)
+        if drawn.get("counters") != counter_view:
+            draw_wall_counters(game)
+            drawn["counters"] = counter_view
+            dirty.append(COUNTER_AREA)
+        if drawn.get("status") != status:
+            draw_status(*status)
+            drawn["status"] = status
+            dirty.append(STATUS_AREA)
+        if dirty:
+            pygame.display.update(dirty)
         clock.tick(60)
-        time.sleep(0.05)
 
 
 if __name__ == "__main__":
     game = Game()
     human_player_id = 0#random.randint(0, 1)
     bot_player_id = 1 - human_player_id
-    bot = nMiniMaxPruningBot(game, bot_player_id, n=3) # HERE IS WHERE YOU CHANGE WHICH BOT TO PLAY AGAINST #
+    bot = nMiniMaxPruningBot(Game(), bot_player_id, n=3) # HERE IS WHERE YOU CHANGE WHICH BOT TO PLAY AGAINST, it plays on a Game of its own #
     main()
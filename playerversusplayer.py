@@ -142,11 +142,9 @@ def draw_highlighted_squares(pawn, legal_moves):
 def get_legal_moves(game, player):
     """Gets the legal moves for the selected player."""
     legal_moves = []
-    directions = [(-1, 0), (1, 0), (0, 1), (0, -1), (-1, 1), (-1,-1), (1, -1), (1, 1), (2,0), (-2,0), (0,2), (0,-2)]  # Possible directions
-    for d in directions:
-        if game.is_legal_move(player, d):
-            new_pos = (player.pos[0] + d[0], player.pos[1] + d[1])
-            legal_moves.append(new_pos)
+    for d in game.legal_pawn_moves(player):
+        new_pos = (player.pos[0] + d[0], player.pos[1] + d[1])
+        legal_moves.append(new_pos)
     return legal_moves
 
 def is_pawn_clicked(pawn, mouse_pos):
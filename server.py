@@ -0,0 +1,413 @@
+# MULTI-GAME SERVER #
+# Hosts many human-vs-bot games at once over TCP, one game per connection. Messages are #
+# JSON objects, one per line. Bot moves run in a bounded process pool, so a slow search  #
+# never holds up the other games. Example:                                               #
+#   python server.py serve --port 8765 --workers 4                                       #
+#   python server.py load-test --port 8765 --sessions 50 --bot RandomBot                 #
+#
+# Client to server:
+#   {"type": "new", "bot": "nMiniMaxPruningBot:n=2", "player": 0, "initial": 300, "increment": 2}
+#                                       bot is one of the names in SERVER_BOTS
+#   {"type": "move", "action": 2}       actions are the integer codes of v1.encode_action
+#   {"type": "state"}
+#   {"type": "resign"}
+# Server to client:
+#   {"type": "state", ...}              after every action, see Session.state_message
+#   {"type": "game_over", "winner": 1, "reason": "goal" | "time" | "resign" | "forfeit"}
+#   {"type": "error", "error": "..."}
+
+import argparse
+import asyncio
+import concurrent.futures
+import inspect
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'Implementation'))
+from v1 import Game, NUM_ACTIONS, SQUARE_INDEX
+from tournament import parse_bot_spec
+
+MAX_LINE = 1 << 16 # longest message accepted from a client
+MAX_BOT_TIME = 10.0 # most seconds a bot thinks about one move, however much is on its clock
+MAX_CLOCK = 3600.0 # most seconds a client can put on the clocks, or have added per move
+
+# Bots a client can ask for by name, and the spec the server builds each one from. Clients
+# never pass arguments of their own, and every bot here either moves at once or stops at the
+# time_limit bot_move hands it
+SERVER_BOTS = {
+    "RandomBot": "RandomBot",
+    "nMiniMaxPruningBot:n=1": "nMiniMaxPruningBot:n=1,tt_size=65536,max_depth=1",
+    "nMiniMaxPruningBot:n=2": "nMiniMaxPruningBot:n=2,tt_size=65536,max_depth=2",
+    "nMiniMaxPruningBot:n=3": "nMiniMaxPruningBot:n=3,tt_size=65536,max_depth=3",
+    "MCTSBot": "MCTSBot:iterations=2000",
+}
+
+
+
+def bot_move(task):
+    '''
+    Replays a game in a worker process, lets a bot pick its move
+    and returns the action code, or None if the bot did not move.
+
+    task:   (spec, codes, player_id, time_limit) where spec is one of
+            SERVER_BOTS, codes are the actions played so far and
+            time_limit is passed to bots whose make_move accepts one
+    '''
+    spec, codes, player_id, time_limit = task
+    game = Game()
+    for code in codes:
+        game.play(code)
+    bot_class, init_kwargs, move_kwargs = parse_bot_spec(spec)
+    if "time_limit" in inspect.signature(bot_class.make_move).parameters:
+        move_kwargs["time_limit"] = time_limit
+    bot = bot_class(game, player_id, **init_kwargs)
+    bot.make_move(**move_kwargs)
+    if len(game.actions) == len(codes):
+        return None
+    return game.codes[-1]
+
+
+
+class Session:
+    def __init__(self, session_id, bot_spec, human_id, initial, increment):
+        '''
+        One game between a client and a bot, with a chess clock.
+
+        session_id:     Number of the session (int)
+        bot_spec:       Bot description from SERVER_BOTS (str)
+        human_id:       Player the client plays as (int)
+        initial:        Seconds on each clock at the start (float)
+        increment:      Seconds added to a clock after every move (float)
+        '''
+        self.session_id = session_id
+        self.game = Game()
+        self.codes = []
+        self.bot_spec = bot_spec
+        self.human_id = human_id
+        self.bot_id = 1 - human_id
+        self.clocks = [float(initial), float(initial)]
+        self.increment = float(increment)
+        self.turn_started = time.monotonic()
+        self.winner = None
+        self.reason = None
+
+    def remaining(self):
+        # Time left on the clock of the player to move
+        return self.clocks[self.game.cur_player] - (time.monotonic() - self.turn_started)
+
+    def play(self, code):
+        '''
+        Plays an action for the player to move, charging their
+        clock. Returns False if the action is illegal or the player
+        ran out of time, which ends the game.
+
+        code:   Action code (int)
+        '''
+        player_id = self.game.cur_player
+        used = time.monotonic() - self.turn_started
+        if used > self.clocks[player_id]:
+            self.end(1 - player_id, "time")
+            return False
+        if not self.game.play(code):
+            return False
+        self.codes.append(code)
+        self.clocks[player_id] += self.increment - used
+        self.turn_started = time.monotonic()
+        if self.game.winner is not None:
+            self.end(self.game.winner, "goal")
+        return True
+
+    def end(self, winner, reason):
+        if self.winner is None and self.reason is None:
+            self.winner = winner
+            self.reason = reason
+
+    @property
+    def over(self):
+        return self.reason is not None
+
+    def state_message(self):
+        game = self.game
+        clocks = list(self.clocks)
+        if not self.over:
+            clocks[game.cur_player] = max(0.0, self.remaining())
+        message = {
+            "type": "state",
+            "session": self.session_id,
+            "player": self.human_id,
+            "cur_player": game.cur_player,
+            "actions": self.codes,
+            "positions": [SQUARE_INDEX[player.pos] for player in game.players],
+            "walls_left": [player.remaining_walls for player in game.players],
+            "clocks": clocks,
+        }
+        if not self.over and game.cur_player == self.human_id:
+            message["legal"] = list(game.legal_codes())
+        return message
+
+
+
+class GameServer:
+    def __init__(self, workers = None, max_sessions = 256, max_pending = None):
+        '''
+        Server for many concurrent games.
+
+        workers:        Processes searching bot moves, defaults to the
+                        number of cores (int)
+        max_sessions:   Games hosted at once, further clients are
+                        turned away (int)
+        max_pending:    Bot searches running or queued at once, others
+                        wait for a free slot off the clock (int)
+        '''
+        self.workers = workers or os.cpu_count() or 1
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending or self.workers
+        self.executor = None
+        self.bot_slots = None
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.bot_moves = 0
+
+    async def start(self, host = "127.0.0.1", port = 8765):
+        '''
+        Starts the worker pool and listens for clients. Returns
+        the asyncio server.
+
+        host:   Address to listen on (str)
+        port:   Port to listen on, 0 for any free port (int)
+        '''
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        self.bot_slots = asyncio.Semaphore(self.max_pending)
+        return await asyncio.start_server(self.handle_client, host, port, limit = MAX_LINE)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait = False, cancel_futures = True)
+
+    async def send(self, writer, message):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain() # waits while a slow client's buffer is full
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            while session is None or not session.over:
+                if session is not None and session.game.cur_player == session.bot_id:
+                    await self.play_bot_move(session)
+                    await self.send(writer, session.state_message())
+                    continue
+                timeout = None if session is None else max(0.0, session.remaining())
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout)
+                except asyncio.TimeoutError:
+                    session.end(session.bot_id, "time")
+                    break
+                if not line:
+                    return
+                try:
+                    message = json.loads(line)
+                    kind = message["type"]
+                except (ValueError, KeyError, TypeError):
+                    await self.send(writer, {"type": "error", "error": "expected a JSON object with a type"})
+                    continue
+
+                if kind == "new" and session is None:
+                    session = self.new_session(message)
+                    if isinstance(session, str):
+                        await self.send(writer, {"type": "error", "error": session})
+                        session = None
+                        if len(self.sessions) >= self.max_sessions:
+                            return
+                        continue
+                    await self.send(writer, session.state_message())
+                elif session is None:
+                    await self.send(writer, {"type": "error", "error": "start a game first"})
+                elif kind == "move":
+                    code = message.get("action")
+                    if not isinstance(code, int) or not 0 <= code < NUM_ACTIONS or not session.play(code):
+                        if not session.over:
+                            await self.send(writer, {"type": "error", "error": "illegal action"})
+                        continue
+                    await self.send(writer, session.state_message())
+                elif kind == "state":
+                    await self.send(writer, session.state_message())
+                elif kind == "resign":
+                    session.end(session.bot_id, "resign")
+                else:
+                    await self.send(writer, {"type": "error", "error": f"unknown message type {kind!r}"})
+
+            await self.send(writer, {"type": "game_over", "session": session.session_id,
+                                     "winner": session.winner, "reason": session.reason})
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            if session is not None:
+                self.sessions.pop(session.session_id, None)
+            writer.close()
+
+    def new_session(self, message):
+        # Returns the new session, or an error message
+        if len(self.sessions) >= self.max_sessions:
+            return "server full"
+        bot = message.get("bot", "RandomBot")
+        if not isinstance(bot, str) or bot not in SERVER_BOTS:
+            return f"unknown bot, expected one of {', '.join(SERVER_BOTS)}"
+        try:
+            human_id = int(message.get("player", 0))
+            initial = float(message.get("initial", 300))
+            increment = float(message.get("increment", 0))
+        except (ValueError, TypeError) as error:
+            return str(error)
+        if human_id not in (0, 1) or not 0 < initial <= MAX_CLOCK or not 0 <= increment <= MAX_CLOCK:
+            return "bad player or time control"
+        session = Session(next(self.session_ids), SERVER_BOTS[bot], human_id, initial, increment)
+        self.sessions[session.session_id] = session
+        return session
+
+    async def play_bot_move(self, session):
+        '''
+        Searches the bot's move in the worker pool and plays it. The
+        bot's clock starts once a worker slot is free. A bot that
+        runs out of time or does not move loses.
+
+        session:    Session where the bot is to move (Session)
+        '''
+        loop = asyncio.get_running_loop()
+        await self.bot_slots.acquire()
+        session.turn_started = time.monotonic()
+        remaining = session.remaining()
+        time_limit = min(MAX_BOT_TIME, max(0.05, min(remaining / 20 + session.increment, remaining / 2)))
+        future = loop.run_in_executor(self.executor, bot_move,
+                                      (session.bot_spec, list(session.codes), session.bot_id, time_limit))
+        # The slot is only given back once the search is really over, even after a timeout
+        future.add_done_callback(lambda _: self.bot_slots.release())
+        try:
+            code = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            session.end(session.human_id, "time")
+            return
+        except Exception:
+            session.end(session.human_id, "forfeit")
+            return
+        self.bot_moves += 1
+        if code is None or not session.play(code):
+            session.end(session.human_id, "forfeit") # does nothing if the bot already lost on time
+
+
+
+async def serve(host, port, workers, max_sessions, max_pending):
+    server = GameServer(workers, max_sessions, max_pending)
+    listener = await server.start(host, port)
+    print(f"serving on {', '.join(str(sock.getsockname()) for sock in listener.sockets)}", file = sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+
+async def play_client(host, port, bot, initial, increment, rng, latencies):
+    '''
+    Plays one game against the server with random legal actions,
+    mostly pawn moves, and returns the game_over message. The time
+    from every move sent to the server's answer is added to latencies.
+
+    host, port:     Address of the server
+    bot:            Bot description to play against (str)
+    initial:        Seconds on each clock (float)
+    increment:      Seconds added per move (float)
+    rng:            Random generator for the moves (random.Random)
+    latencies:      Seconds per answered move, appended to (list)
+    '''
+    reader, writer = await asyncio.open_connection(host, port, limit = MAX_LINE)
+    try:
+        async def send(message):
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+
+        await send({"type": "new", "bot": bot, "player": rng.randrange(2), "initial": initial, "increment": increment})
+        sent = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                return {"type": "game_over", "winner": None, "reason": "disconnected"}
+            message = json.loads(line)
+            if message["type"] == "game_over" or message["type"] == "error":
+                return message
+            if "legal" in message:
+                if sent is not None:
+                    latencies.append(time.perf_counter() - sent)
+                moves = [code for code in message["legal"] if code < 12]
+                code = rng.choice(moves if moves and rng.random() < 0.7 else message["legal"])
+                sent = time.perf_counter()
+                await send({"type": "move", "action": code})
+    finally:
+        writer.close()
+
+
+
+async def load_test(host, port, sessions, bot, initial, increment, seed):
+    '''
+    Plays many games against a server at once and reports how
+    long the server took to answer moves.
+
+    sessions:   Games played at the same time (int)
+    '''
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play_client(host, port, bot, initial, increment, random.Random(rng.getrandbits(32)), latencies)
+                                     for _ in range(sessions)), return_exceptions = True)
+    elapsed = time.perf_counter() - start
+    reasons = {}
+    for result in results:
+        reason = result.get("reason", result.get("error")) if isinstance(result, dict) else type(result).__name__
+        reasons[reason] = reasons.get(reason, 0) + 1
+    latencies.sort()
+    summary = {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "moves": len(latencies),
+        "moves_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "results": reasons,
+    }
+    if latencies:
+        summary["latency_ms"] = {name: 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+                                 for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))}
+    return summary
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Host Quoridor games over TCP, or load test a server")
+    commands = parser.add_subparsers(dest = "command", required = True)
+    serve_parser = commands.add_parser("serve")
+    serve_parser.add_argument("--host", default = "127.0.0.1")
+    serve_parser.add_argument("--port", type = int, default = 8765)
+    serve_parser.add_argument("--workers", type = int, default = None)
+    serve_parser.add_argument("--max-sessions", type = int, default = 256)
+    serve_parser.add_argument("--max-pending", type = int, default = None, help = "bot searches in flight at once")
+    load_parser = commands.add_parser("load-test")
+    load_parser.add_argument("--host", default = "127.0.0.1")
+    load_parser.add_argument("--port", type = int, default = 8765)
+    load_parser.add_argument("--sessions", type = int, default = 20)
+    load_parser.add_argument("--bot", default = "RandomBot")
+    load_parser.add_argument("--initial", type = float, default = 300)
+    load_parser.add_argument("--increment", type = float, default = 0)
+    load_parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.workers, args.max_sessions, args.max_pending))
+        except KeyboardInterrupt:
+            pass
+    else:
+        summary = asyncio.run(load_test(args.host, args.port, args.sessions, args.bot, args.initial, args.increment, args.seed))
+        print(json.dumps(summary, indent = 1))
@@ -0,0 +1,285 @@
+# HEADLESS BOT TOURNAMENT #
+# Plays every pair of bots against each other across a process pool, with seeded random #
+# openings played once with each colour assignment, and reports win rates, Elo, average  #
+# move latency and game length. Example:                                                   #
+#   python tournament.py RandomBot "nMiniMaxBot:n=1" "nMiniMaxPruningBot:n=2" --games 100  #
+
+import argparse
+import ast
+import inspect
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'Implementation'))
+from v1 import Game
+from endgame import is_race, solve
+from records import RecordWriter
+sys.path.append(os.path.join(HERE, 'Bots'))
+from random_bot import RandomBot
+from minimax_bot import MiniMaxBot
+from n_minimax_bot import nMiniMaxBot
+from n_minimax_with_ABpruning_bot import nMiniMaxPruningBot
+from mcts_bot import MCTSBot
+
+BOTS = {
+    "RandomBot": RandomBot,
+    "MiniMaxBot": MiniMaxBot,
+    "nMiniMaxBot": nMiniMaxBot,
+    "nMiniMaxPruningBot": nMiniMaxPruningBot,
+    "MCTSBot": MCTSBot,
+}
+
+
+
+def parse_bot_spec(spec):
+    '''
+    Parses a bot description such as "nMiniMaxPruningBot:n=2,time_limit=1.5"
+    into the bot class, its constructor arguments and its make_move
+    arguments. Arguments that make_move accepts (like time_limit) are
+    passed to it, everything else goes to the constructor.
+
+    spec:   Bot description (str)
+    '''
+    name, _, params = spec.partition(":")
+    if name not in BOTS:
+        raise ValueError(f"unknown bot {name!r}, expected one of {', '.join(BOTS)}")
+    bot_class = BOTS[name]
+    move_params = set(inspect.signature(bot_class.make_move).parameters) - {"self"}
+    init_kwargs, move_kwargs = {}, {}
+    for param in filter(None, params.split(",")):
+        key, _, value = param.partition("=")
+        value = ast.literal_eval(value)
+        (move_kwargs if key in move_params else init_kwargs)[key] = value
+    return bot_class, init_kwargs, move_kwargs
+
+
+
+def play_opening(game, plies, rng):
+    # Random legal actions, mostly pawn moves, so that games do not all start the same way
+    for _ in range(plies):
+        if game.winner is not None:
+            return
+        actions = list(game.legal_actions())
+        moves = [action for action in actions if action[0] == "move"]
+        action_type, action = rng.choice(moves if rng.random() < 0.75 else actions)
+        game.perform_action(game.players[game.cur_player], action_type, action)
+
+
+
+def play_game(task):
+    '''
+    Plays one game in a worker process and returns a summary of it.
+    The winner is None for games cut off at max_plies. With
+    adjudicate, a game stops as soon as both players are out of
+    walls and the race solver decides it, which can be a draw.
+
+    task:   (specs, seed, opening_plies, max_plies, adjudicate) where
+            specs holds the bot descriptions for player 0 and player 1
+    '''
+    specs, seed, opening_plies, max_plies, adjudicate = task
+    random.seed(seed)
+    game = Game()
+    play_opening(game, opening_plies, random.Random(seed))
+
+    bots, move_kwargs = [], []
+    for player_id, spec in enumerate(specs):
+        bot_class, init_kwargs, kwargs = parse_bot_spec(spec)
+        bots.append(bot_class(game, player_id, **init_kwargs))
+        move_kwargs.append(kwargs)
+
+    think_time = [0.0, 0.0]
+    moves_made = [0, 0]
+    winner = None
+    adjudicated = False
+    while game.winner is None and len(game.actions) < max_plies:
+        if adjudicate and is_race(game):
+            winner = solve(game)[0]
+            adjudicated = True
+            break
+        player_id = game.cur_player
+        plies = len(game.actions)
+        start = time.perf_counter()
+        bots[player_id].make_move(**move_kwargs[player_id])
+        think_time[player_id] += time.perf_counter() - start
+        moves_made[player_id] += 1
+        if len(game.actions) == plies: # the bot did not move, so it forfeits
+            winner = 1 - player_id
+            break
+    if game.winner is not None:
+        winner = game.winner
+    return {
+        "specs": list(specs),
+        "seed": seed,
+        "winner": winner,
+        "plies": len(game.actions),
+        "think_time": think_time,
+        "moves_made": moves_made,
+        "adjudicated": adjudicated,
+        "actions": list(game.codes),
+    }
+
+
+
+def elo_ratings(names, games):
+    '''
+    Fits Bradley-Terry ratings to the game results and returns
+    {name: (elo, ci95)}, with the ratings centred on 0. Draws count
+    as half a win for each side, and every pair starts with one
+    virtual draw so that unbeaten bots still get a finite rating.
+    The confidence interval comes from the Fisher information of
+    each rating with the others held fixed.
+
+    names:  Bot descriptions (list of str)
+    games:  Results from play_game (list of dict)
+    '''
+    wins = {(a, b): 0.5 for a in names for b in names if a != b}
+    played = {(a, b): 1 for a in names for b in names if a != b}
+    for game in games:
+        a, b = game["specs"]
+        if a == b:
+            continue
+        played[a, b] += 1
+        played[b, a] += 1
+        if game["winner"] is None:
+            wins[a, b] += 0.5
+            wins[b, a] += 0.5
+        else:
+            winner, loser = (a, b) if game["winner"] == 0 else (b, a)
+            wins[winner, loser] += 1
+
+    strength = {name: 1.0 for name in names}
+    for _ in range(1000):
+        new = {}
+        for a in names:
+            total_wins = sum(wins[a, b] for b in names if b != a)
+            denominator = sum(played[a, b] / (strength[a] + strength[b]) for b in names if b != a)
+            new[a] = total_wins / denominator if denominator else strength[a]
+        scale = math.exp(sum(math.log(s) for s in new.values()) / len(new))
+        new = {name: s / scale for name, s in new.items()}
+        converged = max(abs(math.log(new[n] / strength[n])) for n in names) < 1e-9
+        strength = new
+        if converged:
+            break
+
+    elo_per_nat = 400 / math.log(10)
+    ratings = {}
+    for a in names:
+        information = 0.0
+        for b in names:
+            if b != a:
+                p = strength[a] / (strength[a] + strength[b])
+                information += played[a, b] * p * (1 - p)
+        ci = 1.96 * elo_per_nat / math.sqrt(information) if information else float("inf")
+        ratings[a] = (elo_per_nat * math.log(strength[a]), ci)
+    return ratings
+
+
+
+def summarize(names, games):
+    summary = {"bots": {}, "pairs": {}}
+    for name in names:
+        own = [(g, g["specs"].index(name)) for g in games if name in g["specs"] and g["specs"][0] != g["specs"][1]]
+        moves = sum(g["moves_made"][side] for g, side in own)
+        think = sum(g["think_time"][side] for g, side in own)
+        summary["bots"][name] = {
+            "games": len(own),
+            "wins": sum(1 for g, side in own if g["winner"] == side),
+            "draws": sum(1 for g, side in own if g["winner"] is None),
+            "avg_move_latency": think / moves if moves else 0.0,
+            "avg_game_length": sum(g["plies"] for g, side in own) / len(own) if own else 0.0,
+        }
+        summary["bots"][name]["win_rate"] = (summary["bots"][name]["wins"] + 0.5 * summary["bots"][name]["draws"]) / len(own) if own else 0.0
+    for a, b in itertools.combinations(names, 2):
+        pair = [g for g in games if set(g["specs"]) == {a, b}]
+        a_wins = sum(1 for g in pair if g["winner"] is not None and g["specs"][g["winner"]] == a)
+        b_wins = sum(1 for g in pair if g["winner"] is not None and g["specs"][g["winner"]] == b)
+        summary["pairs"][f"{a} vs {b}"] = {"games": len(pair), "wins": [a_wins, b_wins], "draws": len(pair) - a_wins - b_wins}
+    for name, (elo, ci) in elo_ratings(names, games).items():
+        summary["bots"][name]["elo"] = elo
+        summary["bots"][name]["elo_ci95"] = ci
+    return summary
+
+
+
+def run_tournament(names, games_per_pair, processes = None, opening_plies = 4, max_plies = 200, seed = 0, progress = None,
+                   adjudicate = False, record = None):
+    '''
+    Plays games_per_pair games between every pair of bots, half of
+    them with each colour assignment on the same openings, and
+    returns (games, summary).
+
+    names:          Bot descriptions, see parse_bot_spec (list of str)
+    games_per_pair: Games per pair of bots, rounded up to even (int)
+    processes:      Worker processes, defaults to the number of cores (int)
+    opening_plies:  Random actions played before the bots take over (int)
+    max_plies:      Games longer than this are scored as draws (int)
+    seed:           Seed for the openings and the bots' randomness (int)
+    progress:       Called with (games done, games total) (callable)
+    adjudicate:     Let the race solver decide games once both
+                    players are out of walls (bool)
+    record:         Record file to append every game to, see records.py (str)
+    '''
+    for name in names:
+        parse_bot_spec(name)
+    rng = random.Random(seed)
+    tasks = []
+    for a, b in itertools.combinations(names, 2):
+        for _ in range((games_per_pair + 1) // 2):
+            game_seed = rng.getrandbits(32)
+            tasks.append(((a, b), game_seed, opening_plies, max_plies, adjudicate))
+            tasks.append(((b, a), game_seed, opening_plies, max_plies, adjudicate))
+
+    games = []
+    writer = RecordWriter(record) if record is not None else None
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            for game in pool.imap_unordered(play_game, tasks):
+                codes = game.pop("actions")
+                if writer is not None:
+                    writer.write(codes, game["winner"])
+                games.append(game)
+                if progress is not None:
+                    progress(len(games), len(tasks))
+    finally:
+        if writer is not None:
+            writer.close()
+    return games, summarize(names, games)
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Play a headless round-robin tournament between bots")
+    parser.add_argument("bots", nargs = "+", help = 'bot descriptions such as RandomBot or "nMiniMaxPruningBot:n=2,time_limit=0.5"')
+    parser.add_argument("--games", type = int, default = 100, help = "games per pair of bots")
+    parser.add_argument("--processes", type = int, default = None)
+    parser.add_argument("--opening-plies", type = int, default = 4)
+    parser.add_argument("--max-plies", type = int, default = 200)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--adjudicate", action = "store_true", help = "decide games with the race solver once both players are out of walls")
+    parser.add_argument("--json", help = "write the games and the summary to this file")
+    parser.add_argument("--record", help = "append every game to this record file")
+    args = parser.parse_args()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} games", end = "", file = sys.stderr, flush = True)
+
+    games, summary = run_tournament(args.bots, args.games, args.processes, args.opening_plies, args.max_plies, args.seed, progress,
+                                    args.adjudicate, args.record)
+    print(file = sys.stderr)
+
+    print(f"{'bot':<40} {'games':>6} {'win %':>6} {'elo':>7} {'± 95%':>7} {'ms/move':>8} {'plies':>6}")
+    for name, stats in sorted(summary["bots"].items(), key = lambda item: -item[1]["elo"]):
+        print(f"{name:<40} {stats['games']:>6} {100 * stats['win_rate']:>6.1f} {stats['elo']:>7.0f} {stats['elo_ci95']:>7.0f}"
+              f" {1000 * stats['avg_move_latency']:>8.1f} {stats['avg_game_length']:>6.1f}")
+    for pair, stats in summary["pairs"].items():
+        print(f"{pair}: {stats['wins'][0]}-{stats['wins'][1]} ({stats['draws']} draws)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"games": games, "summary": summary}, f, indent = 1)